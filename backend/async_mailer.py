@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from backend.rate_limiter import QuotaExceeded
+
+
+class AsyncMailer:
+    """
+    asyncio front-end for EmailService.
+    - A few long-lived connections (workers) pipeline SMTP transactions for every caller.
+    - The job queue is bounded, so callers `await` (backpressure) instead of piling up messages in memory.
+    - Blocking smtplib work runs in threads; the event loop stays free for generation and other groups.
+
+    Usage:
+        async with AsyncMailer(mailer, connections=3) as sender:
+            results = await sender.send_batch(group, subject, html)
+    """
+
+    def __init__(self, mailer, connections=3, queue_size=50):
+        self.mailer = mailer
+        self.connections = max(1, connections)
+        self.queue_size = queue_size
+        self._queue = None
+        self._workers = []
+        # Set once the daily cap is hit: later jobs are deferred without touching the provider
+        self._quota_error = None
+
+    @classmethod
+    def from_config(cls, mailer, config):
+        return cls(
+            mailer,
+            connections=config.get('email_async_connections', 3),
+            queue_size=config.get('email_async_queue_size', 50),
+        )
+
+    async def start(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._quota_error = None
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.connections)]
+
+    async def close(self):
+        if self._queue is None:
+            return
+        for _ in self._workers:
+            await self._queue.put(None)
+        await asyncio.gather(*self._workers)
+        self._queue = None
+        self._workers = []
+        if self.mailer.rate_limiter:
+            logging.info(self.mailer.rate_limiter.summary())
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _worker(self, worker_id):
+        server = None
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+
+            job, future = item
+            try:
+                if self._quota_error is not None:
+                    raise self._quota_error
+                if server is None:
+                    server = await asyncio.to_thread(self.mailer._connect)
+                server, results = await asyncio.to_thread(self.mailer.run_job, server, job)
+                if not future.done():
+                    future.set_result(results)
+            except QuotaExceeded as e:
+                # Daily cap hit: defer this and every queued job (send_batch maps them to "deferred")
+                # instead of reconnecting and logging in once per job just to be refused again
+                if self._quota_error is None:
+                    self._quota_error = e
+                    print(f"⏸️ {e}. Deferring the remaining queued recipients.")
+                if not future.done():
+                    future.set_exception(e)
+                server = await self._quit(server)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                # Drop the connection; the next job reconnects
+                server = await self._quit(server)
+            finally:
+                self._queue.task_done()
+
+        await self._quit(server)
+
+    async def _quit(self, server):
+        if server is not None:
+            try:
+                await asyncio.to_thread(server.quit)
+            except Exception:
+                pass
+        return None
+
+    async def send_batch(self, recipient_list, subject, html_content, broadcast=False):
+        """Async twin of EmailService.send_batch; same {email: (state, detail)} result."""
+        if not self.mailer._has_credentials():
+            raise ValueError("Credentials missing")
+        await self.start()
+
+        jobs, results = self.mailer.plan(recipient_list, subject, html_content, broadcast)
+        loop = asyncio.get_running_loop()
+
+        pending = []
+        for job in jobs:
+            future = loop.create_future()
+            await self._queue.put((job, future))  # blocks while the queue is full
+            pending.append((job, future))
+
+        for job, future in pending:
+            try:
+                results.update(await future)
+            except Exception as e:
+                results.update(self.mailer.job_failure(job[0], e, job[1]))
+        return results
@@ -0,0 +1,89 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class ContentCache:
+    """
+    Process-wide LRU of decoded text files, so repeated reads of the same lesson skip the disk.
+    - Entries are keyed by absolute path and validated against the file's (mtime_ns, size) on each
+      read: one os.stat() instead of exists() + open() + read(). A changed file is simply re-read.
+    - Total size is bounded by `max_bytes` (UTF-8 length); least recently used entries go first.
+    Thread-safe: Streamlit serves every session from threads of one process.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # path -> (mtime_ns, size, text, nbytes)
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+    def _drop(self, path):
+        entry = self.entries.pop(path, None)
+        if entry:
+            self.total_bytes -= entry[3]
+
+    def read(self, path):
+        """Returns the file's text (UTF-8), or None if it doesn't exist."""
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            with self.lock:
+                self._drop(path)
+            return None
+
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry and entry[:2] == (st.st_mtime_ns, st.st_size):
+                self.entries.move_to_end(path)
+                self.stats['hits'] += 1
+                return entry[2]
+            self.stats['misses'] += 1
+            if entry:
+                self.stats['stale'] += 1
+                self._drop(path)
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return None
+        self._store(path, st, text)
+        return text
+
+    def _store(self, path, st, text):
+        nbytes = len(text.encode("utf-8"))
+        if nbytes > self.max_bytes:
+            return
+        with self.lock:
+            self._drop(path)
+            self.entries[path] = (st.st_mtime_ns, st.st_size, text, nbytes)
+            self.total_bytes += nbytes
+            while self.total_bytes > self.max_bytes:
+                _, (_, _, _, size) = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                self.stats['evictions'] += 1
+
+    def invalidate(self, path):
+        """Forgets `path` (called after writes; the stat check would also catch them)."""
+        with self.lock:
+            self._drop(os.path.abspath(path))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def summary(self):
+        s = self.stats
+        lookups = s['hits'] + s['misses']
+        rate = (s['hits'] / lookups * 100) if lookups else 0.0
+        return (f"Content cache: {s['hits']} hits / {s['misses']} misses ({rate:.0f}% hit rate), "
+                f"{s['stale']} stale, {s['evictions']} evictions, {len(self.entries)} files / {self.total_bytes} B in memory")
+
+
+# Shared by every LessonManager in the process (all Streamlit sessions, bot workers)
+CONTENT_CACHE = ContentCache()
+
@@ -0,0 +1,189 @@
+import os
+import re
+import sys
+import zlib
+import time
+import sqlite3
+import hashlib
+import logging
+import argparse
+import contextlib
+
+# Single-file alternative to lessons/day_N_<type>.html + topics.log (config 'content_store': 'sqlite').
+# One row per cached item; lessons/reminders are keyed by day, motivations by date (YYYY-MM-DD).
+STORE_NAME = "content.db"
+COMPRESS_MIN_BYTES = 4096  # smaller bodies aren't worth a zlib round-trip
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS content (
+    type TEXT NOT NULL,
+    key TEXT NOT NULL,
+    day INTEGER,
+    date TEXT,
+    content BLOB,
+    compressed INTEGER NOT NULL DEFAULT 0,
+    topic TEXT,
+    model TEXT,
+    created_at REAL NOT NULL,
+    hash TEXT,
+    size INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (type, key)
+);
+CREATE INDEX IF NOT EXISTS idx_content_day ON content(type, day);
+CREATE INDEX IF NOT EXISTS idx_content_date ON content(type, date);
+"""
+
+FILE_RE = re.compile(r"^day_(\d+)_(lesson|reminder)\.html$")
+MOTIVATION_RE = re.compile(r"^motivation_(\d{4}-\d{2}-\d{2})\.html$")
+
+
+class SQLiteContentStore:
+    """
+    Lessons, reminders and motivations in one SQLite file.
+    - get()/put() mirror LessonManager's per-type get/save; bodies over COMPRESS_MIN_BYTES are
+      zlib-compressed when `compress` is on, and every row keeps its sha256, size, model and created_at.
+    - set()/upto() give the same topic-history interface as TopicLog, backed by the day index.
+    WAL mode lets the Streamlit app read while the bot writes.
+    """
+
+    def __init__(self, path, compress=True):
+        self.path = path
+        self.compress = compress
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _conn(self):
+        # New connection per operation, like the outbox: safe from any thread
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _columns(type, key):
+        """(day, date) index columns for a key: days for lessons/reminders, dates for motivations."""
+        if type == "motivation":
+            return None, str(key)
+        return int(key), None
+
+    def get(self, type, key):
+        with self._conn() as conn:
+            row = conn.execute("SELECT content, compressed FROM content WHERE type = ? AND key = ?",
+                               (type, str(key))).fetchone()
+        if row is None or row['content'] is None:
+            return None
+        data = row['content']
+        return (zlib.decompress(data) if row['compressed'] else bytes(data)).decode("utf-8")
+
+    def put(self, type, key, content, model=None, topic=None, created_at=None):
+        raw = content.encode("utf-8")
+        compressed = self.compress and len(raw) >= COMPRESS_MIN_BYTES
+        day, date = self._columns(type, key)
+        with self._conn() as conn:
+            conn.execute(
+                """INSERT INTO content (type, key, day, date, content, compressed, topic, model, created_at, hash, size)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(type, key) DO UPDATE SET
+                       content = excluded.content, compressed = excluded.compressed,
+                       topic = COALESCE(excluded.topic, content.topic), model = excluded.model,
+                       created_at = excluded.created_at, hash = excluded.hash, size = excluded.size""",
+                (type, str(key), day, date, zlib.compress(raw) if compressed else raw, int(compressed), topic, model,
+                 created_at or time.time(), hashlib.sha256(raw).hexdigest(), len(raw))
+            )
+
+    # --- Topic history (TopicLog interface) ---
+
+    def set(self, day, topic):
+        with self._conn() as conn:
+            conn.execute(
+                """INSERT INTO content (type, key, day, topic, created_at) VALUES ('lesson', ?, ?, ?, ?)
+                   ON CONFLICT(type, key) DO UPDATE SET topic = excluded.topic""",
+                (str(int(day)), int(day), topic, time.time())
+            )
+
+    def upto(self, day):
+        """{day: topic} for every lesson day <= `day` (range scan on idx_content_day)."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT day, topic FROM content WHERE type = 'lesson' AND day <= ? AND topic IS NOT NULL ORDER BY day",
+                (int(day),)
+            ).fetchall()
+        return {row['day']: row['topic'] for row in rows}
+
+    # --- Listing ---
+
+    def entries(self, type=None, first_day=None, last_day=None):
+        """Metadata rows (no content), ordered by type then day/date."""
+        query = "SELECT type, key, day, date, topic, model, created_at, hash, size, compressed FROM content WHERE content IS NOT NULL"
+        params = []
+        if type:
+            query += " AND type = ?"
+            params.append(type)
+        if first_day is not None:
+            query += " AND day >= ?"
+            params.append(int(first_day))
+        if last_day is not None:
+            query += " AND day <= ?"
+            params.append(int(last_day))
+        with self._conn() as conn:
+            return [dict(row) for row in conn.execute(query + " ORDER BY type, day, date", params)]
+
+
+def get_store(config, lessons_dir="lessons"):
+    """SQLiteContentStore when data_manager.get_config() has 'content_store': 'sqlite', else None (plain files)."""
+    if config.get('content_store', 'files') != 'sqlite':
+        return None
+    return SQLiteContentStore(
+        config.get('content_store_path') or os.path.join(lessons_dir, STORE_NAME),
+        compress=config.get('content_store_compress', True),
+    )
+
+
+def migrate(lessons_dir, store):
+    """Copies day_N_<type>.html, motivation_<date>.html and the topic history into `store`. Re-runnable."""
+    from backend.topic_log import get_topic_log
+
+    counts = {"lesson": 0, "reminder": 0, "motivation": 0, "topics": 0}
+    for filename in sorted(os.listdir(lessons_dir)):
+        match = FILE_RE.match(filename)
+        if match:
+            type, key = match.group(2), int(match.group(1))
+        else:
+            match = MOTIVATION_RE.match(filename)
+            if not match:
+                continue
+            type, key = "motivation", match.group(1)
+        path = os.path.join(lessons_dir, filename)
+        with open(path, "r", encoding="utf-8") as f:
+            store.put(type, key, f.read(), created_at=os.path.getmtime(path))
+        counts[type] += 1
+
+    for day, topic in get_topic_log(lessons_dir).upto(sys.maxsize).items():
+        store.set(day, topic)
+        counts["topics"] += 1
+    logging.info(f"Migrated {lessons_dir} into {store.path}: {counts}")
+    return counts
+
+
+if __name__ == "__main__":
+    # python -m backend.content_store migrate [--lessons-dir lessons] [--db lessons/content.db]
+    parser = argparse.ArgumentParser(description="PyDaily SQLite content store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate_cmd = sub.add_parser("migrate", help="Import the lessons/ directory into the SQLite store")
+    migrate_cmd.add_argument("--lessons-dir", default="lessons")
+    migrate_cmd.add_argument("--db", default=None, help="Defaults to <lessons-dir>/content.db")
+    migrate_cmd.add_argument("--no-compress", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    db_path = args.db or os.path.join(args.lessons_dir, STORE_NAME)
+    counts = migrate(args.lessons_dir, SQLiteContentStore(db_path, compress=not args.no_compress))
+    print(f"✅ Migrated {counts['lesson']} lessons, {counts['reminder']} reminders, "
+          f"{counts['motivation']} motivations and {counts['topics']} topics into {db_path}")
+    print("   Set 'content_store': 'sqlite' in the config to use it.")
@@ -65,6 +65,10 @@ def get_config():
         config['email_password'] = os.environ['EMAIL_PASSWORD']
     if not config.get('admin_email') and 'ADMIN_EMAIL' in os.environ:
         config['admin_email'] = os.environ['ADMIN_EMAIL']
+    if not config.get('gemini_backend') and 'GEMINI_BACKEND' in os.environ:
+        config['gemini_backend'] = os.environ['GEMINI_BACKEND']
+    if not config.get('remote_cache') and 'REMOTE_CACHE' in os.environ:
+        config['remote_cache'] = os.environ['REMOTE_CACHE']
 
     # Fallback: Streamlit Secrets (Cloud Support)
     try:
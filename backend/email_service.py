@@ -1,76 +1,237 @@
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import datetime
+import logging
+from backend.rate_limiter import RateLimiter, QuotaExceeded
+from backend.email_template import CompiledTemplate
+from backend.mail_transport import SMTPTransport, get_transport
+
+# Per-recipient delivery states (shared with backend.outbox)
+DELIVERY_SENT = 'sent'
+DELIVERY_FAILED = 'failed'
+DELIVERY_RETRY = 'retrying'
 
 class EmailService:
-    def __init__(self, sender_email, sender_password, test_mode=False, admin_email=""):
+    def __init__(self, sender_email, sender_password, test_mode=False, admin_email="", rate_limiter=None, transport=None, bcc_batch_size=50):
         self.sender_email = sender_email
         self.sender_password = sender_password
         self.test_mode = test_mode
         self.admin_email = admin_email
-        self.smtp_server = "smtp.gmail.com" # Default to Gmail for now, customizable later
-        self.smtp_port = 587
+        self.rate_limiter = rate_limiter
+        self.bcc_batch_size = bcc_batch_size
+        # Default to Gmail SMTP; file capture / in-process sink are selectable via config
+        self.transport = transport or SMTPTransport("smtp.gmail.com", 587, sender_email, sender_password)
 
-    def send_email(self, recipient_list, subject, html_content):
-        if not self.sender_email or not self.sender_password:
-             return False, "Credentials missing"
+    @classmethod
+    def from_config(cls, config):
+        """Builds a mailer (with provider-aware rate limiting) from data_manager.get_config()."""
+        return cls(
+            config.get('email_address'),
+            config.get('email_password'),
+            test_mode=config.get('test_mode', False),
+            admin_email=config.get('admin_email', ''),
+            rate_limiter=RateLimiter.from_config(config),
+            transport=get_transport(config),
+            bcc_batch_size=config.get('email_bcc_batch_size', 50)
+        )
 
-        try:
-            # 1. Connect & Login
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.sender_email, self.sender_password)
-            
-            # 2. Iterate and Send
-            failed = []
-            for recipient in recipient_list:
-                try:
-                    # SANDBOX LOGIC
-                    target_email = recipient['email']
-                    final_subject = subject
-
-                    if self.test_mode:
-                        if not self.admin_email:
-                            print(f"⚠️ Test Mode ON but no Admin Email set! Skipping {target_email}")
-                            continue
-                        print(f"🧪 [TEST MODE] Redirecting {target_email} -> {self.admin_email}")
-                        target_email = self.admin_email
-                        final_subject = f"[TEST MODE] {subject}"
-                        
-                    # 4. Personalization
-                    student_name = recipient.get('name', 'Future Pythonista')
-                    personalized_html = html_content.replace('{{NAME}}', student_name)
-
-                    # Create FRESH message for every recipient
-                    msg = MIMEMultipart()
-                    msg['From'] = self.sender_email
-                    msg['Subject'] = final_subject
-                    msg.attach(MIMEText(personalized_html, 'html'))
-                    msg['To'] = target_email
-                    
-                    server.send_message(msg)
-                    print(f"✅ Sent email to {target_email}")
-                    
-                except Exception as e:
-                    print(f"❌ Failed to send to {target_email}: {e}")
-                    failed.append(f"{target_email}: {str(e)}")
+    @property
+    def from_address(self):
+        return self.sender_email or "pydaily@localhost"
+
+    def _has_credentials(self):
+        if not self.transport.requires_credentials:
+            return True
+        return bool(self.sender_email and self.sender_password)
+
+    def _connect(self):
+        return self.transport.open()
+
+    def _deliver(self, server, to_addrs, raw_message):
+        """
+        Sends one pre-built message through the limiter.
+        On a throttle reply (or a dropped connection) it slows down, reconnects and retries once.
+        Returns (server, refused) - the (possibly new) connection and smtplib's refused-recipients dict.
+        """
+        for attempt in range(2):
+            if self.rate_limiter:
+                # Providers count daily quota per recipient, so a Bcc batch uses len(to_addrs)
+                self.rate_limiter.acquire(len(to_addrs))
+            try:
+                refused = server.sendmail(self.from_address, to_addrs, raw_message)
+                if self.rate_limiter:
+                    self.rate_limiter.on_success()
+                return server, refused or {}
+            except smtplib.SMTPResponseException as e:
+                if attempt or not self.rate_limiter or not self.rate_limiter.is_throttle(e.smtp_code, e.smtp_error):
+                    raise
+                self.rate_limiter.on_throttle(e.smtp_code, e.smtp_error)
+            except smtplib.SMTPServerDisconnected:
+                if attempt:
+                    raise
+            # Throttled connections are usually closed by the provider
+            try:
+                server.quit()
+            except Exception:
+                pass
+            server = self._connect()
+        return server, {}
 
-            # 3. Quit
+    @staticmethod
+    def _code_state(code, reply=""):
+        """5xx (bad mailbox, rejected recipient) won't succeed on retry; 4xx (greylisting, busy) and throttles might."""
+        if 500 <= code < 600 and not RateLimiter.is_throttle(code, reply):
+            return DELIVERY_FAILED
+        return DELIVERY_RETRY
+
+    def _is_permanent(self, error):
+        if isinstance(error, smtplib.SMTPResponseException):
+            return self._code_state(error.smtp_code, error.smtp_error) == DELIVERY_FAILED
+        return False
+
+    def send_batch(self, recipient_list, subject, html_content, broadcast=False):
+        """
+        Sends to every recipient and reports each one separately.
+        Returns {original_email: (state, detail)} where state is DELIVERY_SENT, DELIVERY_FAILED
+        (permanent, don't retry) or DELIVERY_RETRY (transient).
+        With broadcast=True, content without {{NAME}} goes out as one Bcc envelope per batch
+        instead of one transaction per student.
+        Connection/login errors are raised so the caller can decide what to do with the whole batch.
+        """
+        if not self._has_credentials():
+            raise ValueError("Credentials missing")
+
+        # 1. Connect & Login
+        server = self._connect()
+
+        # 2. Plan & Send
+        jobs, results = self.plan(recipient_list, subject, html_content, broadcast)
+        for index, job in enumerate(jobs):
+            try:
+                server, job_results = self.run_job(server, job)
+                results.update(job_results)
+            except QuotaExceeded as e:
+                # Daily cap hit: defer the rest of the batch instead of hammering the provider
+                deferred = [email for pending in jobs[index:] for email in pending[0]]
+                print(f"⏸️ {e}. Deferring {len(deferred)} recipients.")
+                results.update(self.job_failure(deferred, e))
+                break
+            except Exception as e:
+                results.update(self.job_failure(job[0], e, job[1]))
+
+        # 3. Quit
+        try:
             server.quit()
-            
-            if failed:
-                return False, f"Partial failure: {', '.join(failed)}"
-            return True, "Emails sent successfully!"
+        except Exception:
+            pass
 
+        if self.rate_limiter:
+            logging.info(self.rate_limiter.summary())
+        return results
+
+    def plan(self, recipient_list, subject, html_content, broadcast=False):
+        """
+        Turns a send into SMTP transactions without touching the network.
+        Returns (jobs, results): each job is (original_emails, envelope_to, raw_message);
+        `results` already holds recipients that need no transaction (test mode without admin email).
+        """
+        # Split/encode the body once; each recipient only swaps headers + name
+        template = CompiledTemplate(html_content)
+        emails = [r['email'] for r in recipient_list]
+
+        # SANDBOX LOGIC
+        if self.test_mode and not self.admin_email:
+            print(f"⚠️ Test Mode ON but no Admin Email set! Skipping {len(emails)} recipients")
+            return [], {email: (DELIVERY_SENT, "Skipped (test mode, no admin email)") for email in emails}
+
+        jobs = []
+        if broadcast and not template.personalized:
+            # One message per batch: To is the sender, students ride on the envelope (Bcc)
+            if self.test_mode:
+                print(f"🧪 [TEST MODE] Redirecting broadcast to {len(emails)} recipients -> {self.admin_email}")
+                raw_message = template.build(self.from_address, self.admin_email, f"[TEST MODE] {subject}")
+                return [(emails, [self.admin_email], raw_message)], {}
+
+            raw_message = template.build(self.from_address, self.from_address, subject)
+            for start in range(0, len(emails), self.bcc_batch_size):
+                batch = emails[start:start + self.bcc_batch_size]
+                jobs.append((batch, batch, raw_message))
+            return jobs, {}
+
+        for recipient in recipient_list:
+            target_email = recipient['email']
+            final_subject = subject
+            if self.test_mode:
+                print(f"🧪 [TEST MODE] Redirecting {target_email} -> {self.admin_email}")
+                target_email = self.admin_email
+                final_subject = f"[TEST MODE] {subject}"
+
+            # 4. Personalization
+            student_name = recipient.get('name') or 'Future Pythonista'
+            raw_message = template.build(self.from_address, target_email, final_subject, student_name)
+            jobs.append(([recipient['email']], [target_email], raw_message))
+        return jobs, {}
+
+    def run_job(self, server, job):
+        """Sends one planned transaction. Returns (server, {original_email: (state, detail)})."""
+        originals, to_addrs, raw_message = job
+        server, refused = self._deliver(server, to_addrs, raw_message)
+
+        if len(originals) != len(to_addrs):
+            # Test-mode broadcast: a single admin copy stands in for everyone
+            print(f"✅ Sent email to {to_addrs[0]}")
+            return server, {email: (DELIVERY_SENT, "Sent (test mode)") for email in originals}
+
+        results = {}
+        for original, target in zip(originals, to_addrs):
+            if target in refused:
+                code, reply = refused[target]
+                results[original] = (self._code_state(code, reply), f"{code} {reply}")
+            else:
+                results[original] = (DELIVERY_SENT, "Sent")
+        if len(to_addrs) == 1:
+            print(f"✅ Sent email to {to_addrs[0]}")
+        else:
+            print(f"✅ Broadcast batch sent to {len(to_addrs) - len(refused)} recipients")
+        return server, results
+
+    def job_failure(self, emails, error, targets=None):
+        """
+        Maps an exception to per-recipient results. `targets` are the envelope addresses for `emails`
+        (they differ in test mode); SMTPRecipientsRefused is classified per refused address.
+        """
+        if isinstance(error, QuotaExceeded):
+            return {email: (DELIVERY_FAILED, "deferred (daily limit)") for email in emails}
+        print(f"❌ Failed to send to {', '.join(emails)}: {error}")
+        if isinstance(error, smtplib.SMTPRecipientsRefused) and error.recipients:
+            targets = targets if targets and len(targets) == len(emails) else [None] * len(emails)
+            fallback = next(iter(error.recipients.values()))
+            results = {}
+            for email, target in zip(emails, targets):
+                code, reply = error.recipients.get(target, fallback)
+                if isinstance(reply, bytes):
+                    reply = reply.decode('utf-8', errors='ignore')
+                results[email] = (self._code_state(code, reply), f"{code} {reply}")
+            return results
+        state = DELIVERY_FAILED if self._is_permanent(error) else DELIVERY_RETRY
+        return {email: (state, str(error)) for email in emails}
+
+    def send_email(self, recipient_list, subject, html_content, broadcast=False):
+        if not self._has_credentials():
+             return False, "Credentials missing"
+
+        try:
+            results = self.send_batch(recipient_list, subject, html_content, broadcast=broadcast)
         except Exception as e:
             return False, str(e)
 
+        failed = [f"{email}: {detail}" for email, (state, detail) in results.items() if state != DELIVERY_SENT]
+        if failed:
+            return False, f"Partial failure: {', '.join(failed)}"
+        return True, "Emails sent successfully!"
+
     def test_connection(self):
         try:
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.sender_email, self.sender_password)
+            server = self._connect()
             server.quit()
             return True, "Connection Successful"
         except Exception as e:
@@ -0,0 +1,62 @@
+import binascii
+from email.header import Header
+from email.utils import formatdate, make_msgid
+
+PLACEHOLDER = '{{NAME}}'
+CRLF = b'\r\n'
+SOFT_BREAK = b'=' + CRLF  # quoted-printable line continuation: decodes to nothing
+
+
+def _qp_lines(data):
+    """Quoted-printable with CRLF line breaks (lines <= 76 chars, as SMTP wants)."""
+    data = data.replace(b'\r\n', b'\n')
+    return binascii.b2a_qp(data, quotetabs=False, istext=True).replace(b'\n', CRLF)
+
+
+class CompiledTemplate:
+    """
+    An HTML email body prepared once for a whole send.
+    - The HTML is split at the placeholder a single time and every static part is
+      quoted-printable encoded once.
+    - QP is byte-local, so a personalized body is just the encoded parts with the encoded name
+      spliced in between; soft line breaks at the joins keep every line within the 76-char limit.
+    - Per recipient we only encode the name, join bytes and write the headers.
+    """
+
+    def __init__(self, html_content, placeholder=PLACEHOLDER):
+        parts = html_content.split(placeholder)
+        self.segments = [_qp_lines(p.encode('utf-8')) for p in parts]
+        self.personalized = len(parts) > 1
+        self._subjects = {}
+        self._names = {}
+
+    def _subject_header(self, subject):
+        # Subjects are emoji-heavy, so RFC 2047 encode them (once per distinct subject)
+        encoded = self._subjects.get(subject)
+        if encoded is None:
+            encoded = Header(subject, 'utf-8').encode().replace('\n', '\r\n').encode('ascii')
+            self._subjects[subject] = encoded
+        return encoded
+
+    def render_body(self, name=""):
+        if not self.personalized:
+            return self.segments[0]
+        encoded = self._names.get(name)
+        if encoded is None:
+            encoded = self._names[name] = SOFT_BREAK + _qp_lines(name.encode('utf-8')) + SOFT_BREAK
+        return encoded.join(self.segments)
+
+    def build(self, sender, recipient, subject, name=""):
+        """Returns the raw RFC 5322 message bytes for one recipient."""
+        domain = sender.rpartition('@')[2] or None
+        headers = CRLF.join([
+            b'From: ' + sender.encode('utf-8'),
+            b'To: ' + recipient.encode('utf-8'),
+            b'Subject: ' + self._subject_header(subject),
+            b'Date: ' + formatdate(localtime=True).encode('ascii'),
+            b'Message-ID: ' + make_msgid(domain=domain).encode('ascii'),
+            b'MIME-Version: 1.0',
+            b'Content-Type: text/html; charset="utf-8"',
+            b'Content-Transfer-Encoding: quoted-printable',
+        ])
+        return headers + CRLF + CRLF + self.render_body(name)
@@ -0,0 +1,204 @@
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+
+# Offline stand-in for google.generativeai models (config 'gemini_backend': fake).
+# Models hand out responses with the attributes GeminiService reads:
+#   .text, .prompt_feedback, .usage_metadata, and iteration over chunks when stream=True
+# The line that names the day being generated; prompts list earlier days (history) before it
+DAY_RE = re.compile(r'(?:Newsletter for |check-in email for |"title": ")Day (\d+)')
+# Insights prompts carry the students as a JSON list right after this header
+DATA_RE = re.compile(r"DATA \([^)]*\):\s*")
+
+
+class ServiceUnavailable(Exception):
+    """Injected transient failure; classify_error() maps it like the SDK's 503."""
+    code = 503
+
+
+class _Usage:
+    def __init__(self, prompt, text):
+        self.prompt_token_count = len(prompt) // 4
+        self.candidates_token_count = len(text) // 4
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count
+
+
+class _Response:
+    prompt_feedback = None
+
+    def __init__(self, text, usage=None, chunks=None, chunk_delay=0.0):
+        self.text = text
+        self.usage_metadata = usage
+        self._chunks = chunks
+        self._chunk_delay = chunk_delay
+
+    def __iter__(self):
+        for chunk in self._chunks or [self.text]:
+            if self._chunk_delay:
+                time.sleep(self._chunk_delay)
+            yield _Response(chunk)
+
+
+class FakeModel:
+    def __init__(self, backend, model_name):
+        self.backend = backend
+        self.model_name = model_name
+
+    def generate_content(self, prompt, generation_config=None, stream=False, request_options=None):
+        return self.backend.respond(self.model_name, prompt, generation_config, stream)
+
+
+class FakeGeminiBackend:
+    """
+    Deterministic offline generator.
+    - `latency`: seconds per call (spread across chunks when streaming)
+    - `failure_rate`: share of calls that raise a transient ServiceUnavailable
+    - `output_size`: approximate characters of lesson body text
+    - `seed`: same seed + same prompts (in the same order) -> same outputs and failures
+    Output is picked from the request: response_schema for quiz/insights/tip JSON, prompt text otherwise.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, output_size=3000, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.output_size = output_size
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.attempts = {}
+        self.stats = {"calls": 0, "failures": 0, "chars": 0}
+
+    def model(self, model_name):
+        return FakeModel(self, model_name)
+
+    def _random(self, model_name, prompt):
+        """Per-prompt RNG; repeated calls (retries) get the next state so failures aren't permanent."""
+        digest = hashlib.sha256(f"{model_name}\x00{prompt}".encode("utf-8")).hexdigest()
+        with self.lock:
+            attempt = self.attempts.get(digest, 0)
+            self.attempts[digest] = attempt + 1
+            self.stats['calls'] += 1
+        return random.Random(f"{self.seed}:{digest}:{attempt}")
+
+    def respond(self, model_name, prompt, generation_config=None, stream=False):
+        rnd = self._random(model_name, prompt)
+        if rnd.random() < self.failure_rate:
+            if self.latency:
+                time.sleep(self.latency * rnd.uniform(0.1, 0.5))
+            with self.lock:
+                self.stats['failures'] += 1
+            raise ServiceUnavailable("503 The model is overloaded (fake backend)")
+
+        text = self._content(prompt, generation_config, rnd)
+        with self.lock:
+            self.stats['chars'] += len(text)
+        usage = _Usage(prompt, text)
+
+        if stream:
+            size = max(1, len(text) // 8)
+            chunks = [text[i:i + size] for i in range(0, len(text), size)]
+            return _Response(text, usage, chunks, self.latency / len(chunks))
+        if self.latency:
+            time.sleep(self.latency * rnd.uniform(0.8, 1.2))
+        return _Response(text, usage)
+
+    # --- Content ---
+
+    def _content(self, prompt, generation_config, rnd):
+        schema = (generation_config or {}).get("response_schema") or {}
+        properties = schema.get("properties", {})
+        if "questions" in properties:
+            return self._quiz(prompt, rnd)
+        if "student_feedback" in properties:
+            return self._insights(prompt, rnd)
+        if "message" in properties:
+            return json.dumps({"subject": "Quick Tip based on your Quiz 💡",
+                               "message": "Hi {{NAME}}, " + self._sentence(rnd, 2)})
+        if "Newsletter for Day" in prompt:
+            return self._lesson(prompt, rnd)
+        if "check-in" in prompt:
+            return self._card("#2c3e50", f"🌙 Nightly Check-in: Day {self._day(prompt)}", self._sentence(rnd, 3))
+        if "Mid-Day Boost" in prompt:
+            return self._card("#F59E0B", "⚡ Mid-Day Boost", f"“{self._sentence(rnd, 1)}” {self._sentence(rnd, 2)}")
+        return f"<p>{self._sentence(rnd, 3)}</p>"
+
+    WORDS = ("python", "list", "loop", "function", "value", "object", "module", "string", "index",
+             "practice", "debug", "return", "class", "variable", "scope", "test", "data", "code")
+
+    def _sentence(self, rnd, count=1):
+        return " ".join(
+            " ".join(rnd.choice(self.WORDS) for _ in range(rnd.randint(6, 12))).capitalize() + "."
+            for _ in range(count)
+        )
+
+    @staticmethod
+    def _day(prompt):
+        match = DAY_RE.search(prompt) or re.search(r"Day (\d+)", prompt)
+        return int(match.group(1)) if match else 1
+
+    @staticmethod
+    def _card(color, title, body):
+        return (f'<div style="font-family: Helvetica, Arial, sans-serif; max-width:600px; margin:0 auto;">'
+                f'<div style="background-color:{color}; color:white; padding:15px; text-align:center;"><h3>{title}</h3></div>'
+                f'<div style="padding:20px; color:#333;"><p>{body}</p></div></div>')
+
+    def _lesson(self, prompt, rnd):
+        day = self._day(prompt)
+        match = re.search(r"TODAY'S TOPIC: (.*)", prompt)
+        topic = match.group(1).strip() if match else "Python Concepts"
+        paragraphs = []
+        while sum(len(p) for p in paragraphs) < self.output_size:
+            paragraphs.append(f"<p>{self._sentence(rnd, 4)}</p>")
+        code = '<pre style="background-color:#1e293b; color:#f8fafc; padding:15px;"><code>print("Day %d")\n</code></pre>' % day
+        practice = "".join(f"<li><strong>Problem {i}</strong>: {self._sentence(rnd)}</li>" for i in range(1, 6))
+        return (f"<!-- TOPIC: {topic} -->"
+                f'<div style="font-family: \'Segoe UI\', Helvetica, Arial, sans-serif; max-width:600px; margin:0 auto;">'
+                f'<div style="background: linear-gradient(135deg, #6366f1 0%, #a855f7 100%); color:white; padding:32px 24px; text-align:center;">'
+                f"<div>🚀 PyDaily &bull; Day {day}</div><h1>{topic}</h1></div>"
+                f'<div style="padding:32px; color:#334155; line-height:1.7;">{"".join(paragraphs)}{code}'
+                f"<h3>🏋️ Cumulative Practice (5 Problems)</h3><ol>{practice}</ol></div></div>")
+
+    def _quiz(self, prompt, rnd):
+        questions = []
+        for i in range(1, 11):
+            options = [f"{letter}) {rnd.choice(self.WORDS)} {i}{letter.lower()}" for letter in "ABCD"]
+            questions.append({
+                "id": i,
+                "question": self._sentence(rnd).rstrip(".") + "?",
+                "options": options,
+                "answer": rnd.choice(options),
+                "explanation": self._sentence(rnd),
+            })
+        return json.dumps({"title": f"Day {self._day(prompt)} Checkpoint", "questions": questions})
+
+    def _insights(self, prompt, rnd):
+        return json.dumps({"student_feedback": [
+            {"email": row.get('email'), "subject": "Quick Tip based on your Quiz 💡", "message": self._sentence(rnd, 2)}
+            for row in self._students(prompt)
+        ]})
+
+    @staticmethod
+    def _students(prompt):
+        """The JSON student list _insights_chunk embeds after its DATA header."""
+        match = DATA_RE.search(prompt)
+        if not match:
+            return []
+        try:
+            rows, _ = json.JSONDecoder().raw_decode(prompt, match.end())
+        except ValueError:
+            return []
+        return [row for row in rows if isinstance(row, dict)] if isinstance(rows, list) else []
+
+
+def get_backend(config):
+    """FakeGeminiBackend when data_manager.get_config() has 'gemini_backend': fake, else None (real API)."""
+    if config.get('gemini_backend', 'api') != 'fake':
+        return None
+    return FakeGeminiBackend(
+        latency=config.get('gemini_fake_latency', 0.0),
+        failure_rate=config.get('gemini_fake_failure_rate', 0.0),
+        output_size=config.get('gemini_fake_output_size', 3000),
+        seed=config.get('gemini_fake_seed', 0),
+    )
@@ -0,0 +1,167 @@
+import os
+import time
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def temp_path(path):
+    """A sibling path unique to this process/thread, e.g. day_3_lesson.html.1234.5678.partial."""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.partial"
+
+
+def atomic_write(path, text, lock=None):
+    """
+    Writes `text` to a unique temp file next to `path`, fsyncs it and os.replace()s it into place,
+    so readers see either the old file or the new one, never a partial write.
+    `lock` (a FileLock/SingleFlight lock) serializes writers that must not interleave.
+    """
+    tmp = temp_path(path)
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if lock is None:
+            os.replace(tmp, path)
+        else:
+            with lock:
+                os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class LockTimeout(TimeoutError):
+    """Raised when a FileLock could not be acquired within its timeout."""
+    pass
+
+
+class FileLock:
+    """
+    Exclusive advisory lock on a lock file, shared by threads and processes on the same host.
+    - POSIX: flock() on the open file; Windows: msvcrt.locking() on its first byte.
+    - The OS drops the lock when the holder exits or crashes, so there are no stale locks to clean up.
+    - The lock file itself is left in place (deleting it would let two holders lock different inodes).
+    Use as a context manager; `timeout=None` waits forever.
+    """
+
+    def __init__(self, path, timeout=None, poll_interval=0.1):
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.fd = None
+
+    def _try_lock(self, fd):
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self):
+        """Blocks until the lock is held. Returns seconds spent waiting; raises LockTimeout."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        start = time.monotonic()
+        while not self._try_lock(fd):
+            waited = time.monotonic() - start
+            if self.timeout is not None and waited >= self.timeout:
+                os.close(fd)
+                raise LockTimeout(f"Timed out after {waited:.0f}s waiting for {self.path}")
+            time.sleep(self.poll_interval)
+        self.fd = fd
+        return time.monotonic() - start
+
+    def release(self):
+        if self.fd is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self.fd, 0, os.SEEK_SET)
+                msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class SingleFlight:
+    """
+    Per-key FileLocks under `lock_dir`, so only one caller (thread or process) runs a given
+    generation at a time. Threads of this process queue on an in-memory lock first, which keeps
+    them from busy-polling the file. In-memory locks are refcounted and dropped once no thread
+    holds or waits on them, so a long-running app doesn't keep one per key forever.
+    """
+
+    def __init__(self, lock_dir, timeout=300):
+        self.lock_dir = lock_dir
+        self.timeout = timeout
+        self._locks = {}  # key -> [threading.Lock, holders + waiters]
+        self._guard = threading.Lock()
+
+    def _checkout(self, key):
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+            return entry[0]
+
+    def _checkin(self, key):
+        with self._guard:
+            entry = self._locks[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def lock(self, key):
+        return _KeyLock(self, key, FileLock(os.path.join(self.lock_dir, f"{key}.lock"), self.timeout))
+
+
+class _KeyLock:
+    def __init__(self, flight, key, file_lock):
+        self.flight = flight
+        self.key = key
+        self.file_lock = file_lock
+        self.thread_lock = None
+        self.waited = 0.0
+
+    def __enter__(self):
+        start = time.monotonic()
+        timeout = self.file_lock.timeout
+        thread_lock = self.flight._checkout(self.key)
+        if not thread_lock.acquire(timeout=-1 if timeout is None else timeout):
+            self.flight._checkin(self.key)
+            raise LockTimeout(f"Timed out waiting for {self.file_lock.path}")
+        try:
+            self.file_lock.acquire()
+        except BaseException:
+            thread_lock.release()
+            self.flight._checkin(self.key)
+            raise
+        self.thread_lock = thread_lock
+        self.waited = time.monotonic() - start
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self.file_lock.release()
+        finally:
+            self.thread_lock.release()
+            self.thread_lock = None
+            self.flight._checkin(self.key)
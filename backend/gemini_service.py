@@ -1,6 +1,16 @@
 import os
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import google.generativeai as genai
 import logging
+from backend.response_cache import ResponseCache
+from backend.usage_metrics import UsageTracker
+from backend.rate_limiter import TokenBucket
+from backend import structured_output, fake_gemini
+from backend.structured_output import StructuredOutputError
 
 # Setup Logging
 logging.basicConfig(
@@ -9,18 +19,7 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-class GeminiService:
-    def __init__(self, api_key):
-        if not api_key:
-            logging.error("GeminiService initialized without API Key")
-            raise ValueError("API Key is missing")
-        
-        logging.info(f"Configuring Gemini with Key: {api_key[:5]}...{api_key[-3:]}")
-        genai.configure(api_key=api_key)
-        
-        self.model_name = 'gemini-flash-latest'
-        logging.info(f"Using Model: {self.model_name}")
-        self.model = genai.GenerativeModel(self.model_name, system_instruction="""
+SYSTEM_INSTRUCTION = """
 You are "PyDaily", an enthusiastic, expert Python Tutor bot.
 
 Your mission:
@@ -29,11 +28,316 @@ Goal: Logically progress from basics to Data Structures & Algorithms, to advance
 
 Tone:
 Friendly, Mentor-like, use emojis sparingly.
-""")
+"""
 
-    def generate_lesson(self, day_number, topic, phase, phase_goal, history_context=None):
-        logging.info(f"Attempting to generate lesson for Day {day_number} on topic: {topic}")
+class GenerationError(Exception):
+    """
+    The model could not produce usable content.
+    `kind` is 'quota' (429), 'transient' (5xx/timeouts), 'safety' (blocked) or 'fatal' (anything else).
+    """
+    kind = "fatal"
+
+    def __init__(self, message, call_type=None, model_name=None):
+        super().__init__(message)
+        self.call_type = call_type
+        self.model_name = model_name
+
+class GenerationQuotaError(GenerationError):
+    kind = "quota"
+
+class GenerationUnavailableError(GenerationError):
+    kind = "transient"
+
+class GenerationBlockedError(GenerationError):
+    kind = "safety"
+
+RETRYABLE_KINDS = ("quota", "transient")
+
+# Task routing: model, generation settings and per-request timeout (seconds) for each generate_* task.
+# Short-form tasks get a lighter model and small output budgets; lessons get the large budget.
+# Override per task with config['gemini_routes'], e.g. {"reminder": {"model": "gemini-flash-latest"}}.
+DEFAULT_ROUTES = {
+    "lesson":      {"model": "gemini-flash-latest", "max_output_tokens": 8192, "temperature": 0.9, "timeout": 120},
+    "quiz":        {"model": "gemini-flash-latest", "max_output_tokens": 4096, "temperature": 0.4, "timeout": 90},
+    "insights":    {"model": "gemini-flash-latest", "max_output_tokens": 8192, "temperature": 0.4, "timeout": 90},
+    "cluster_tip": {"model": "gemini-flash-lite-latest", "max_output_tokens": 512, "temperature": 0.6, "timeout": 30},
+    "reminder":    {"model": "gemini-flash-lite-latest", "max_output_tokens": 1024, "temperature": 0.8, "timeout": 30},
+    "motivation":  {"model": "gemini-flash-lite-latest", "max_output_tokens": 512, "temperature": 1.0, "timeout": 30},
+}
+GENERATION_KEYS = ("max_output_tokens", "temperature", "top_p", "top_k")
+
+def build_routes(overrides=None):
+    """DEFAULT_ROUTES with per-task overrides merged in (unknown tasks start from the lesson route)."""
+    routes = {task: dict(route) for task, route in DEFAULT_ROUTES.items()}
+    for task, route in (overrides or {}).items():
+        routes.setdefault(task, dict(DEFAULT_ROUTES["lesson"])).update(route)
+    return routes
+
+def classify_error(error, call_type=None, model_name=None):
+    """Maps SDK/transport exceptions onto the GenerationError hierarchy."""
+    if isinstance(error, GenerationError):
+        return error
+    name = type(error).__name__
+    code = getattr(error, 'code', None)
+    if callable(code):
+        code = None  # grpc-style .code() methods; rely on the class name instead
+    message = f"{name}: {error}"
+
+    if code == 429 or name in ("ResourceExhausted", "TooManyRequests"):
+        return GenerationQuotaError(message, call_type, model_name)
+    if (isinstance(code, int) and (code >= 500 or code == 408)) or name in (
+            "ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "GatewayTimeout",
+            "RetryError", "ConnectionError", "TimeoutError"):
+        return GenerationUnavailableError(message, call_type, model_name)
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return GenerationUnavailableError(message, call_type, model_name)
+    if name in ("BlockedPromptException", "StopCandidateException"):
+        return GenerationBlockedError(message, call_type, model_name)
+    return GenerationError(message, call_type, model_name)
+
+class GeminiService:
+    def __init__(self, api_key, response_cache=None, fallback_model=None, deadline=120, max_attempts=4, base_delay=2,
+                 usage=None, json_retries=1, insights_chunk_size=40, insights_workers=3, requests_per_minute=10,
+                 backend=None, routes=None):
+        # backend: None -> the Gemini API; a fake_gemini.FakeGeminiBackend -> offline, no key needed
+        self.backend = backend
+        if backend is None:
+            if not api_key:
+                logging.error("GeminiService initialized without API Key")
+                raise ValueError("API Key is missing")
+            
+            logging.info(f"Configuring Gemini with Key: {api_key[:5]}...{api_key[-3:]}")
+            genai.configure(api_key=api_key)
         
+        self.model_name = 'gemini-flash-latest'
+        self.system_instruction = SYSTEM_INSTRUCTION
+        if backend is not None:
+            # Separate cache keys so fake output is never served by the real backend
+            self.model_name = f"fake-{self.model_name}"
+            logging.warning("Using the FAKE Gemini backend (offline, generated placeholder content)")
+        logging.info(f"Using Model: {self.model_name}")
+        self._models = {}
+        self._models_lock = threading.Lock()
+        self.model = self._model(self.model_name)
+        self.routes = build_routes(routes)
+
+        # Identical prompts (dashboard + bot, cycle reruns) are answered from disk
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        # Tokens, latency and cost of every API call (see usage.summary())
+        self.usage = usage if usage is not None else UsageTracker()
+
+        # Resilience: retry quota/5xx errors with jittered backoff inside a deadline, then try the fallback
+        self.fallback_model_name = fallback_model
+        self.fallback_model = None
+        if fallback_model:
+            if backend is not None:
+                self.fallback_model_name = f"fake-{fallback_model}"
+            self.fallback_model = self._model(self.fallback_model_name)
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        # Structured output: regenerations allowed when a JSON reply can't be repaired
+        self.json_retries = json_retries
+
+        # Class insights: bounded batches of students, generated concurrently under an RPM cap
+        self.insights_chunk_size = insights_chunk_size
+        self.insights_workers = max(1, insights_workers)
+        self.insights_bucket = TokenBucket(requests_per_minute, 60) if requests_per_minute else None
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config.get('gemini_key'),
+            response_cache=ResponseCache.from_config(config),
+            fallback_model=config.get('gemini_fallback_model'),
+            deadline=config.get('gemini_deadline', 120),
+            max_attempts=config.get('gemini_max_attempts', 4),
+            usage=UsageTracker.from_config(config),
+            json_retries=config.get('gemini_json_retries', 1),
+            insights_chunk_size=config.get('gemini_insights_chunk_size', 40),
+            insights_workers=config.get('gemini_concurrency', 3),
+            requests_per_minute=config.get('gemini_requests_per_minute', 10),
+            backend=fake_gemini.get_backend(config),
+            routes=config.get('gemini_routes'),
+        )
+
+    def _model(self, model_name):
+        """Model instances are created once per name and shared by every route using them."""
+        with self._models_lock:
+            if model_name not in self._models:
+                if self.backend is not None:
+                    self._models[model_name] = self.backend.model(model_name)
+                else:
+                    self._models[model_name] = genai.GenerativeModel(model_name, system_instruction=self.system_instruction)
+            return self._models[model_name]
+
+    def _route_model(self, call_type):
+        """Name of the model a task is routed to (what errors and metrics should report)."""
+        route = self.routes.get(call_type, {})
+        if not route.get('model'):
+            return self.model_name
+        return f"fake-{route['model']}" if self.backend is not None else route['model']
+
+    def _route(self, call_type, generation_config=None):
+        """(model_name, model, generation_config, timeout) for a task, from the routing table."""
+        route = self.routes.get(call_type, {})
+        model_name = self._route_model(call_type)
+        config = {key: route[key] for key in GENERATION_KEYS if key in route}
+        config.update(generation_config or {})
+        return model_name, self._model(model_name), config, route.get('timeout')
+
+    def _call(self, model, model_name, prompt, call_type, generation_config=None, timeout=None):
+        """One API call. Blocked/empty responses become GenerationBlockedError."""
+        kwargs = {'generation_config': generation_config} if generation_config else {}
+        if timeout:
+            kwargs['request_options'] = {'timeout': timeout}
+        started = time.monotonic()
+        try:
+            response = model.generate_content(prompt, **kwargs)
+        except Exception as e:
+            error = classify_error(e, call_type, model_name)
+            self.usage.record(call_type, model_name, time.monotonic() - started, error=error)
+            raise error from e
+        self.usage.record(call_type, model_name, time.monotonic() - started, response)
+
+        feedback = getattr(response, 'prompt_feedback', None)
+        if feedback is not None and getattr(feedback, 'block_reason', None):
+            raise GenerationBlockedError(f"Prompt blocked: {feedback.block_reason}", call_type, model_name)
+        try:
+            text = response.text
+        except ValueError as e:
+            # .text raises when the candidate has no parts (safety / recitation stop)
+            raise GenerationBlockedError(f"No content returned: {e}", call_type, model_name) from e
+        if not text or not text.strip():
+            raise GenerationUnavailableError("Empty response", call_type, model_name)
+        return text
+
+    def _call_with_retry(self, model, model_name, prompt, call_type, deadline, generation_config=None, timeout=None):
+        attempt = 0
+        while True:
+            try:
+                return self._call(model, model_name, prompt, call_type, generation_config, timeout)
+            except GenerationError as e:
+                attempt += 1
+                if e.kind not in RETRYABLE_KINDS or attempt >= self.max_attempts:
+                    raise
+                delay = self.base_delay * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                if time.monotonic() + delay > deadline:
+                    raise
+                logging.warning(f"Gemini {e.kind} error on {call_type} ({model_name}), retry {attempt} in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+    def _generate(self, prompt, call_type, ttl=None, generation_config=None, refresh=False):
+        """
+        Single entry point for model calls: content-addressed cache first, then the API
+        (with retries and the optional fallback model). Raises GenerationError instead of returning error text.
+        `refresh` skips the cache lookup (the cached answer was unusable) and overwrites the entry.
+        Model, generation settings and timeout come from the task's route (see DEFAULT_ROUTES).
+        """
+        model_name, model, generation_config, timeout = self._route(call_type, generation_config)
+        extra = json.dumps(generation_config, sort_keys=True) if generation_config else ""
+        key = ResponseCache.make_key(model_name, self.system_instruction, prompt, extra)
+        fallback_key = None
+        if self.fallback_model_name:
+            fallback_key = ResponseCache.make_key(self.fallback_model_name, self.system_instruction, prompt, extra)
+
+        cached = None if refresh else self.response_cache.get(key, ttl=ttl)
+        if cached is None and fallback_key and not refresh:
+            cached = self.response_cache.get(fallback_key, ttl=ttl)
+        if cached is not None:
+            logging.info(f"Response cache hit ({call_type})")
+            self.usage.record_cache_hit(call_type, model_name)
+            return cached
+
+        deadline = time.monotonic() + self.deadline
+        try:
+            text = self._call_with_retry(model, model_name, prompt, call_type, deadline, generation_config, timeout)
+            self.response_cache.put(key, text, model_name)
+            return text
+        except GenerationError as e:
+            if not self.fallback_model or e.kind == "fatal":
+                logging.error(f"Gemini API Error ({call_type}): {e}")
+                raise
+            logging.warning(f"Primary model failed ({e.kind}) for {call_type}; switching to {self.fallback_model_name}")
+
+        # Fallback gets a fresh (shorter) window of its own
+        deadline = time.monotonic() + self.deadline / 2
+        try:
+            text = self._call_with_retry(self.fallback_model, self.fallback_model_name, prompt, call_type, deadline,
+                                         generation_config, timeout)
+        except GenerationError as e:
+            logging.error(f"Gemini API Error ({call_type}, fallback): {e}")
+            raise
+        self.response_cache.put(fallback_key, text, self.fallback_model_name)
+        return text
+
+    def _generate_json(self, prompt, call_type, schema, fixup=None, check=None):
+        """
+        Structured output: the API is constrained to `schema` (response_schema), the reply is
+        repaired/validated locally, and only an unrepairable reply costs one regeneration.
+        Returns the validated data as a normalized JSON string.
+        """
+        config = structured_output.generation_config(schema)
+        for attempt in range(1 + self.json_retries):
+            text = self._generate(prompt, call_type, generation_config=config, refresh=attempt > 0)
+            try:
+                data = structured_output.parse(text, schema, fixup=fixup, check=check)
+                return json.dumps(data, ensure_ascii=False)
+            except StructuredOutputError as e:
+                logging.warning(f"Invalid {call_type} JSON (attempt {attempt + 1}): {e}")
+                error = e
+        raise GenerationError(f"Model returned invalid JSON: {error}", call_type, self._route_model(call_type))
+
+    def _stream(self, prompt, call_type):
+        """
+        Streaming twin of _generate(): yields text chunks as the model produces them.
+        A cache hit is yielded as one chunk. Errors before the first chunk fall back to
+        _generate() (retries + fallback model); errors mid-stream raise GenerationError.
+        """
+        model_name, model, generation_config, timeout = self._route(call_type)
+        extra = json.dumps(generation_config, sort_keys=True) if generation_config else ""
+        key = ResponseCache.make_key(model_name, self.system_instruction, prompt, extra)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            logging.info(f"Response cache hit ({call_type})")
+            self.usage.record_cache_hit(call_type, model_name)
+            yield cached
+            return
+
+        kwargs = {'generation_config': generation_config} if generation_config else {}
+        if timeout:
+            kwargs['request_options'] = {'timeout': timeout}
+        chunks = []
+        started = time.monotonic()
+        response = None
+        try:
+            response = model.generate_content(prompt, stream=True, **kwargs)
+            for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError as e:
+                    raise GenerationBlockedError(f"Stream stopped: {e}", call_type, model_name) from e
+                if text:
+                    chunks.append(text)
+                    yield text
+        except Exception as e:
+            error = classify_error(e, call_type, model_name)
+            self.usage.record(call_type, model_name, time.monotonic() - started, response, error=error)
+            if chunks or error.kind not in RETRYABLE_KINDS:
+                logging.error(f"Gemini API Error ({call_type}, stream): {error}")
+                raise error from e
+            logging.warning(f"Streaming {call_type} failed before the first chunk ({error.kind}); retrying without streaming")
+            yield self._generate(prompt, call_type)
+            return
+
+        # usage_metadata is filled in once the stream has been fully consumed
+        self.usage.record(call_type, model_name, time.monotonic() - started, response)
+        text = "".join(chunks)
+        if not text.strip():
+            raise GenerationUnavailableError("Empty response", call_type, model_name)
+        self.response_cache.put(key, text, model_name)
+
+    def _lesson_prompt(self, day_number, topic, phase, phase_goal, history_context=None):
         # 2. Build Context
         context_str = f"""
         TODAY'S TOPIC: {topic}
@@ -45,11 +349,7 @@ Friendly, Mentor-like, use emojis sparingly.
         INSTRUCTION: Create a comprehensive, FUN, and detailed lesson about "{topic}".
         """
         
-        # Debug Log
-        print(f"🎨 Generating Content for Day {day_number}: {topic}")
-
-        try:
-            prompt = f"""
+        return f"""
             Generate the official PyDaily Newsletter for Day {day_number}.
             
             {context_str}
@@ -103,12 +403,30 @@ Friendly, Mentor-like, use emojis sparingly.
 
             3. NO MARKDOWN. RETURN ONLY THE HTML STRING.
             """
-            response = self.model.generate_content(prompt)
+
+    def generate_lesson(self, day_number, topic, phase, phase_goal, history_context=None):
+        logging.info(f"Attempting to generate lesson for Day {day_number} on topic: {topic}")
+        
+        # Debug Log
+        print(f"🎨 Generating Content for Day {day_number}: {topic}")
+
+        try:
+            prompt = self._lesson_prompt(day_number, topic, phase, phase_goal, history_context)
+            text = self._generate(prompt, "lesson")
             logging.info("Content generated successfully")
-            return response.text
+            return text
+        except GenerationError:
+            raise
         except Exception as e:
-            logging.error(f"Gemini API Error: {str(e)}")
-            return f"Error generating content: {str(e)}"
+            logging.error(f"Gemini Error (lesson): {str(e)}")
+            raise GenerationError(f"Error generating lesson: {e}", "lesson", self._route_model("lesson")) from e
+
+    def generate_lesson_stream(self, day_number, topic, phase, phase_goal, history_context=None):
+        """Same lesson as generate_lesson(), yielded in chunks as it streams in (see LessonManager.stream_lesson)."""
+        logging.info(f"Attempting to stream lesson for Day {day_number} on topic: {topic}")
+        prompt = self._lesson_prompt(day_number, topic, phase, phase_goal, history_context)
+        yield from self._stream(prompt, "lesson")
+        logging.info("Content streamed successfully")
 
     def generate_quiz(self, day_number, history_context):
         logging.info(f"Attempting to generate JSON QUIZ for Day {day_number}")
@@ -128,18 +446,18 @@ Friendly, Mentor-like, use emojis sparingly.
             - **Content**: Mix of Theory (6) and Code Output Prediction (4).
             
             JSON SCHEMA:
-            {
+            {{
                 "title": "Day {day_number} Checkpoint",
                 "questions": [
-                    {
+                    {{
                         "id": 1,
                         "question": "What is the output of the following code...",
                         "options": ["A) Error", "B) 10", "C) 20", "D) None"],
                         "answer": "B) 10", 
                         "explanation": "Because Python..."
-                    }
+                    }}
                 ]
-            }
+            }}
             
             STRICT RULES:
             1. Return ONLY the raw JSON string.
@@ -148,39 +466,39 @@ Friendly, Mentor-like, use emojis sparingly.
             4. "answer" must match one of the "options" exactly.
             """
             
-            response = self.model.generate_content(prompt)
-            # Clean potential markdown
-            text = response.text.replace('```json', '').replace('```', '').strip()
-            return text
+            # Constrained to QUIZ_SCHEMA; answers are normalized to match an option exactly
+            return self._generate_json(prompt, "quiz", structured_output.QUIZ_SCHEMA,
+                                       fixup=structured_output.fix_quiz, check=structured_output.quiz_violations)
+        except GenerationError:
+            raise
         except Exception as e:
-            logging.error(f"Gemini API Error (Quiz): {str(e)}")
-            # Return a valid empty JSON structure on fallback so UI doesn't crash
-            return '{"title": "Error", "questions": []}'
+            logging.error(f"Gemini Error (quiz): {str(e)}")
+            raise GenerationError(f"Error generating quiz: {e}", "quiz", self._route_model("quiz")) from e
 
-    def generate_class_insights(self, quiz_results_list, topic_context):
-        logging.info(f"Generating CLASS INSIGHTS for {len(quiz_results_list)} students")
+    def _insights_chunk(self, quiz_results_list, topic_context, question_summary=""):
+        """One insights call for a bounded batch of students. Returns the parsed feedback list."""
+        # Minify data to save token window
+        # We need: Student Email (for mapping), and WRONG answers (for analysis)
+        # wrong_summary/total come from quiz_analysis.enrich_results ('Q2,Q5' against the QUESTIONS table)
+        minified_data = []
+        for res in quiz_results_list:
+            row = {
+                "email": res.get('email'),
+                "score": f"{res.get('score')}/{res.get('total', res.get('total_questions'))}",
+            }
+            if res.get('wrong_summary'):
+                row["wrong"] = res['wrong_summary']
+            minified_data.append(row)
         
-        try:
-            # Minify data to save token window
-            # We need: Student Email (for mapping), and WRONG answers (for analysis)
-            minified_data = []
-            for res in quiz_results_list:
-                # res structure: {'email': '...', 'score': 5, 'total': 10, 'answers_json': { '1': 'A', ...}, 'questions_context': ...}
-                # Ideally, we pass the Question Text + Student Answer vs Correct Answer
-                # For now, let's assume we pass a summary string if possible, OR we let Gemini infer from raw data if we pass the Quiz Context.
-                # Simplest approach: Pass "Student X Analysis" string.
-                minified_data.append({
-                    "email": res.get('email'),
-                    "score": f"{res.get('score')}/{res.get('total')}",
-                    "wrong_answers": res.get('wrong_summary', 'Not specified') # We will calculate this before calling
-                })
-            
-            prompt = f"""
+        prompt = f"""
             You are a Senior Python Instructor. 
             I have quiz results for {len(quiz_results_list)} students on the topic: "{topic_context}".
             
-            DATA:
-            {minified_data}
+            QUESTIONS (miss rate across the class):
+            {question_summary or "Not available"}
+            
+            DATA (per student; "wrong" lists the question ids they missed):
+            {json.dumps(minified_data, ensure_ascii=False)}
             
             TASK:
             1. Analyze each student's performance.
@@ -200,14 +518,138 @@ Friendly, Mentor-like, use emojis sparingly.
             
             STRICT JSON ONLY. NO MARKDOWN.
             """
+        
+        if self.insights_bucket:
+            self.insights_bucket.acquire()
+        text = self._generate_json(prompt, "insights", structured_output.INSIGHTS_SCHEMA)
+        return json.loads(text)['student_feedback']
+
+    def _insights_pass(self, quiz_results_list, topic_context, feedback, question_summary=""):
+        """
+        Runs the batches concurrently and merges into `feedback` ({email: entry}).
+        Entries for emails outside a batch and duplicates are dropped. Returns the errors of failed batches.
+        """
+        size = max(1, self.insights_chunk_size)
+        chunks = [quiz_results_list[i:i + size] for i in range(0, len(quiz_results_list), size)]
+        errors = []
+        with ThreadPoolExecutor(max_workers=min(self.insights_workers, len(chunks))) as executor:
+            futures = {executor.submit(self._insights_chunk, chunk, topic_context, question_summary): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                expected = {str(r.get('email', '')).strip().lower() for r in futures[future]}
+                try:
+                    entries = future.result()
+                except GenerationError as e:
+                    logging.error(f"Insights batch of {len(futures[future])} failed ({e.kind}): {e}")
+                    errors.append(e)
+                    continue
+                for entry in entries:
+                    email = str(entry.get('email', '')).strip().lower()
+                    if email in expected and email not in feedback:
+                        feedback[email] = entry
+        return errors
+
+    def generate_class_insights(self, quiz_results_list, topic_context, question_summary=""):
+        """
+        Remedial tips for a day's quiz results, generated in batches of `insights_chunk_size` students
+        (concurrently, rate limited) and merged so every input email gets exactly one entry:
+        - students the model skipped are asked for once more, then get a score-based fallback tip;
+        - students whose batch failed outright are left out (they stay pending for the next run).
+        `question_summary` (quiz_analysis.enrich_results) is shared by every batch.
+        Returns the merged {"student_feedback": [...]} JSON string.
+        """
+        logging.info(f"Generating CLASS INSIGHTS for {len(quiz_results_list)} students")
+        
+        try:
+            students = {}
+            for res in quiz_results_list:
+                email = str(res.get('email') or '').strip().lower()
+                if email:
+                    students.setdefault(email, res)
+            if not students:
+                return json.dumps({"student_feedback": []})
+
+            feedback = {}
+            errors = self._insights_pass(list(students.values()), topic_context, feedback, question_summary)
+
+            missing = [res for email, res in students.items() if email not in feedback]
+            if missing:
+                logging.warning(f"Insights missing for {len(missing)} students, retrying them once")
+                errors += self._insights_pass(missing, topic_context, feedback, question_summary)
+
+            if not feedback and errors:
+                raise errors[0]
+
+            merged = []
+            skipped = 0
+            for email, res in students.items():
+                entry = feedback.get(email)
+                if entry is None:
+                    if errors:
+                        skipped += 1
+                        continue
+                    entry = self._fallback_tip(res, topic_context)
+                merged.append({"email": res.get('email'), "subject": entry['subject'], "message": entry['message']})
+            if skipped:
+                logging.warning(f"Insights: {skipped} students left pending after failed batches")
+            return json.dumps({"student_feedback": merged}, ensure_ascii=False)
             
-            response = self.model.generate_content(prompt)
-            text = response.text.replace('```json', '').replace('```', '').strip()
-            return text
+        except GenerationError:
+            raise
+        except Exception as e:
+            logging.error(f"Gemini Error (insights): {str(e)}")
+            raise GenerationError(f"Error generating insights: {e}", "insights", self._route_model("insights")) from e
+
+    def generate_cluster_tip(self, topic_context, missed_questions, cluster_size, placeholder="{{NAME}}"):
+        """
+        One remedial tip shared by every student with the same wrong-answer pattern (see quiz_analysis).
+        The message greets the student with `placeholder`, which the mailer personalizes per recipient.
+        Returns {'subject': ..., 'message': ...}.
+        """
+        logging.info(f"Generating CLUSTER TIP for {cluster_size} students ({len(missed_questions)} missed questions)")
+        try:
+            missed = [{"question": q.get('question'), "correct_answer": q.get('answer'), "why": q.get('explanation')}
+                      for q in missed_questions]
+            prompt = f"""
+            You are a Senior Python Instructor writing ONE short feedback email that will be sent to several students.
+            Quiz topic: "{topic_context}".
+            
+            QUESTIONS THESE STUDENTS GOT WRONG:
+            {json.dumps(missed, ensure_ascii=False) if missed else "None - they answered every question correctly."}
+            
+            TASK:
+            1. Write a 2-3 sentence "Remedial Tip" that targets the misconception behind these mistakes.
+            2. If they got everything right, praise them and suggest an advanced topic to explore.
+            3. Start the message with "Hi {placeholder}," exactly (it is replaced with each student's name).
+            4. Do not mention scores, other students or that the email is shared.
             
+            OUTPUT SCHEMA (JSON):
+            {{
+                "subject": "Quick Tip based on your Quiz 💡",
+                "message": "Hi {placeholder}, ..."
+            }}
+            
+            STRICT JSON ONLY. NO MARKDOWN.
+            """
+            if self.insights_bucket:
+                self.insights_bucket.acquire()
+            tip = json.loads(self._generate_json(prompt, "cluster_tip", structured_output.TIP_SCHEMA))
+            if placeholder not in tip['message']:
+                tip['message'] = f"Hi {placeholder}, {tip['message']}"
+            return tip
+        except GenerationError:
+            raise
         except Exception as e:
-            logging.error(f"Insight Gen Error: {e}")
-            return '{"student_feedback": []}'
+            logging.error(f"Gemini Error (cluster_tip): {str(e)}")
+            raise GenerationError(f"Error generating cluster tip: {e}", "cluster_tip", self._route_model("cluster_tip")) from e
+
+    @staticmethod
+    def _fallback_tip(res, topic_context):
+        """Used only when the model keeps skipping a student despite a successful call."""
+        return {
+            "subject": "Quick Tip based on your Quiz 💡",
+            "message": (f"Thanks for taking the quiz on {topic_context}! "
+                        f"Review the questions you missed and try today's challenge again to lock it in."),
+        }
 
     def generate_reminder(self, day_number):
         logging.info(f"Attempting to generate REMINDER for Day {day_number}")
@@ -236,11 +678,12 @@ Friendly, Mentor-like, use emojis sparingly.
 
             2. NO MARKDOWN. RETURN ONLY THE HTML STRING.
             """
-            response = self.model.generate_content(prompt)
-            return response.text
+            return self._generate(prompt, "reminder")
+        except GenerationError:
+            raise
         except Exception as e:
-            logging.error(f"Gemini API Error (Reminder): {str(e)}")
-            return f"Error generating reminder: {str(e)}"
+            logging.error(f"Gemini Error (reminder): {str(e)}")
+            raise GenerationError(f"Error generating reminder: {e}", "reminder", self._route_model("reminder")) from e
             
     def generate_motivation(self):
         logging.info("Attempting to generate MID-DAY motivation")
@@ -257,8 +700,10 @@ Friendly, Mentor-like, use emojis sparingly.
             2. Title: "⚡ Mid-Day Boost"
             3. NO MARKDOWN.
             """
-            response = self.model.generate_content(prompt)
-            return response.text
+            # Same prompt every day: keep cached quotes short-lived so each day gets a fresh one
+            return self._generate(prompt, "motivation", ttl=12 * 3600)
+        except GenerationError:
+            raise
         except Exception as e:
-            logging.error(f"Gemini API Error (Motivation): {str(e)}")
-            return f"Error generating motivation: {str(e)}"
+            logging.error(f"Gemini Error (motivation): {str(e)}")
+            raise GenerationError(f"Error generating motivation: {e}", "motivation", self._route_model("motivation")) from e
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from backend import curriculum
+from backend.rate_limiter import TokenBucket
+
+
+def is_quiz_day(day):
+    return (int(day) % 3 == 0) and (int(day) > 0)
+
+
+def morning_request(day):
+    """The bot's morning content for a day: a quiz every third day, otherwise a lesson."""
+    return {'type': 'quiz' if is_quiz_day(day) else 'lesson', 'day': day}
+
+
+class GenerationPool:
+    """
+    Runs a batch of generation requests concurrently.
+    - Requests are dicts: {'type': 'lesson' | 'quiz' | 'reminder', 'day': n}
+    - Already cached days are returned straight away without a model call.
+    - At most `max_workers` calls are in flight and `requests_per_minute` caps the API rate.
+    - Results come back as they finish as (request, content, error). Workers go through
+      LessonManager.get_or_create, so a day already being generated elsewhere (dashboard, bot)
+      is waited for and reused rather than generated twice.
+    """
+
+    def __init__(self, gemini, cache, max_workers=3, requests_per_minute=10):
+        self.gemini = gemini
+        self.cache = cache
+        self.max_workers = max(1, max_workers)
+        self.bucket = TokenBucket(requests_per_minute, 60) if requests_per_minute else None
+
+    @classmethod
+    def from_config(cls, gemini, cache, config):
+        return cls(
+            gemini,
+            cache,
+            max_workers=config.get('gemini_concurrency', 3),
+            requests_per_minute=config.get('gemini_requests_per_minute', 10),
+        )
+
+    # --- Request helpers (caller thread) ---
+
+    def _cached(self, request):
+        if request['type'] == 'reminder':
+            return self.cache.get_reminder(request['day'])
+        return self.cache.get_lesson(request['day'])
+
+    def _build_call(self, request):
+        """Resolves topic/history up front and returns a zero-argument callable for a worker."""
+        day = request['day']
+        kind = request['type']
+
+        if kind == 'lesson':
+            topic = curriculum.TOPICS.get(day, "Python Concepts")
+            phase, phase_goal = curriculum.get_phase_info(day)
+            history = self.cache.get_topics_history(day - 1)
+            return lambda: self.gemini.generate_lesson(day, topic, phase, phase_goal, history)
+        if kind == 'quiz':
+            history = self.cache.get_topics_history(day)
+            return lambda: self.gemini.generate_quiz(day, history)
+        if kind == 'reminder':
+            return lambda: self.gemini.generate_reminder(day)
+        raise ValueError(f"Unknown generation type: {kind}")
+
+    # --- Worker thread ---
+
+    def _run(self, request, call):
+        def limited():
+            # Only real model calls spend rate budget; reused results don't
+            if self.bucket:
+                self.bucket.acquire()
+            return call()
+
+        kind = 'reminder' if request['type'] == 'reminder' else 'lesson'
+        try:
+            model = self.gemini.routes.get(request['type'], {}).get('model')
+            return request, self.cache.get_or_create(request['day'], limited, type=kind, model=model), None
+        except Exception as e:
+            logging.error(f"Generation failed for Day {request['day']} {request['type']}: {e}")
+            return request, None, e
+
+    # --- Public API ---
+
+    def generate(self, requests):
+        """Threaded: yields (request, content, error) in completion order."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = []
+            for request in requests:
+                cached = self._cached(request)
+                if cached:
+                    yield request, cached, None
+                    continue
+                futures.append(executor.submit(self._run, request, self._build_call(request)))
+
+            for future in as_completed(futures):
+                request, content, error = future.result()
+                yield request, content, error
+
+    async def agenerate(self, requests):
+        """asyncio twin of generate(); model calls run in the pool's threads, never on the event loop."""
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            pending = []
+            for request in requests:
+                cached = self._cached(request)
+                if cached:
+                    yield request, cached, None
+                    continue
+                pending.append(loop.run_in_executor(executor, self._run, request, self._build_call(request)))
+
+            for next_done in asyncio.as_completed(pending):
+                request, content, error = await next_done
+                yield request, content, error
+        finally:
+            executor.shutdown(wait=False)
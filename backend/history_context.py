@@ -0,0 +1,119 @@
+import re
+from functools import lru_cache
+from backend import curriculum
+
+# Prompt context for "what has the student already covered?"
+# - The last RECENT_DAYS days are listed in full.
+# - Everything older is folded into one line per phase (computed once and cached).
+# - The whole block never exceeds TOKEN_BUDGET (rough estimate), however far the cohort has got.
+RECENT_DAYS = 7
+TOKEN_BUDGET = 400
+BLOCK_DAYS = 20  # days past the curriculum map are summarized in blocks of this size
+
+PARENS_RE = re.compile(r"\s*\(.*?\)")
+
+
+def estimate_tokens(text):
+    """~4 characters per token; good enough for budgeting prompt growth."""
+    return len(text) // 4 + 1
+
+
+@lru_cache(maxsize=None)
+def phase_spans():
+    """{phase: (first_day, last_day)} derived from curriculum.get_phase_info over the topic map."""
+    spans = {}
+    for day in sorted(curriculum.TOPICS):
+        phase, _ = curriculum.get_phase_info(day)
+        first, last = spans.get(phase, (day, day))
+        spans[phase] = (min(first, day), max(last, day))
+    return spans
+
+
+def _short_topic(topic, max_words=4):
+    """'Essential String Methods (.upper(), .lower())' -> 'Essential String Methods'"""
+    words = PARENS_RE.sub("", topic).replace(":", "").split()
+    return " ".join(words[:max_words])
+
+
+@lru_cache(maxsize=256)
+def _summarize(label, goal, topics):
+    """One compressed line for a run of days. Cached: the same phase is summarized on every call."""
+    goal = goal.rstrip(". ")
+    seen = []
+    for topic in topics:
+        short = _short_topic(topic)
+        if short not in seen:
+            seen.append(short)
+    full = f"{label}{' - ' + goal if goal else ''}: {', '.join(seen)}"
+    brief = f"{label}{' - ' + goal if goal else ''}"
+    return full, brief
+
+
+def _blocks(last_day):
+    """Yields (label, goal, first, last) runs covering days 1..last_day: curriculum phases, then fixed-size blocks."""
+    day = 1
+    spans = phase_spans()
+    for phase in sorted(spans, key=lambda p: spans[p][0]):
+        first, last = spans[phase]
+        if first > last_day:
+            return
+        last = min(last, last_day)
+        yield f"Phase {phase} (Days {first}-{last})", curriculum.PHASE_GOALS.get(phase, ""), first, last
+        day = last + 1
+
+    while day <= last_day:
+        last = min(day + BLOCK_DAYS - 1, last_day)
+        yield f"Days {day}-{last}", "", day, last
+        day = last + 1
+
+
+def build_history(up_to_day, extra_topics=None, recent_days=RECENT_DAYS, token_budget=TOKEN_BUDGET):
+    """
+    Bounded history context for lesson/quiz prompts covering days 1..up_to_day.
+    `extra_topics` ({day: topic}, e.g. LessonManager's topics log) fills days the curriculum map doesn't cover.
+    """
+    up_to_day = int(up_to_day)
+    if up_to_day < 1:
+        return ""
+    extra_topics = extra_topics or {}
+
+    def topic_for(day):
+        return curriculum.TOPICS.get(day) or extra_topics.get(str(day)) or extra_topics.get(day) or "General Python"
+
+    cut = max(1, up_to_day - recent_days + 1)
+    used = estimate_tokens("Days 1-N: earlier fundamentals\nEARLIER PHASES: \nRECENT DAYS: ")  # fixed framing
+
+    # 1. Recent days in full (newest first, so the budget keeps the freshest ones)
+    recent = []
+    for day in range(up_to_day, cut - 1, -1):
+        line = f"Day {day}: {topic_for(day)}"
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            cut = day + 1
+            break
+        recent.insert(0, line)
+        used += cost
+
+    # 2. Older days as per-phase summaries (newest phase first), falling back to the phase goal only
+    summaries = []
+    covered_from = cut
+    for label, goal, first, last in reversed(list(_blocks(cut - 1))):
+        full, brief = _summarize(label, goal, tuple(topic_for(d) for d in range(first, last + 1)))
+        for text in (full, brief):
+            cost = estimate_tokens(text)
+            if used + cost <= token_budget:
+                summaries.insert(0, text)
+                used += cost
+                covered_from = first
+                break
+        else:
+            break
+
+    lines = []
+    if covered_from > 1:
+        lines.append(f"Days 1-{covered_from - 1}: earlier fundamentals")
+    if summaries:
+        lines.append("EARLIER PHASES: " + " | ".join(summaries))
+    if recent:
+        lines.append("RECENT DAYS: " + "; ".join(recent))
+    return "\n".join(lines)
@@ -0,0 +1,105 @@
+import re
+from collections import Counter
+
+# Leading ```html / trailing ``` that the model sometimes wraps around its output
+LEADING_FENCE_RE = re.compile(r"^\s*```[\w-]*[ \t]*\n?")
+TRAILING_FENCE_RE = re.compile(r"\n?[ \t]*```\s*$")
+
+# Blocks whose whitespace is meaningful (code samples!) are never touched
+PRESERVE_RE = re.compile(r"(<(pre|textarea|script)\b.*?</\2\s*>)", re.IGNORECASE | re.DOTALL)
+
+# Comments are dropped, except the TOPIC tag LessonManager relies on and Outlook conditionals
+COMMENT_RE = re.compile(r"<!--(?!\s*TOPIC:)(?!\[if)(?!<!\[endif).*?-->", re.IGNORECASE | re.DOTALL)
+
+BLOCK_TAGS = "div|p|h[1-6]|ul|ol|li|table|thead|tbody|tr|td|th|hr|br|html|head|body|meta|title|style|blockquote|section|header|footer|details|summary"
+BLOCK_TAG_RE = re.compile(r"\s*(</?(?:" + BLOCK_TAGS + r")\b[^>]*>)\s*", re.IGNORECASE)
+WHITESPACE_RE = re.compile(r"\s+")
+STYLE_ATTR_RE = re.compile(r"""\sstyle\s*=\s*(["'])(.*?)\1""", re.IGNORECASE | re.DOTALL)
+TAG_RE = re.compile(r"<([a-zA-Z][\w-]*)([^<>]*)>")
+
+
+def strip_fences(content):
+    """Removes a leading ```lang fence and a trailing ``` fence."""
+    content = LEADING_FENCE_RE.sub("", content, count=1)
+    return TRAILING_FENCE_RE.sub("", content, count=1)
+
+
+def looks_like_html(content):
+    return content.lstrip().startswith("<")
+
+
+def _normalize_style(style):
+    """'color: red ; margin : 0;' -> 'color:red;margin:0'"""
+    if "url(" in style:
+        return style.strip()
+    declarations = []
+    for decl in style.split(";"):
+        if ":" not in decl:
+            continue
+        prop, value = decl.split(":", 1)
+        declarations.append(f"{prop.strip()}:{WHITESPACE_RE.sub(' ', value.strip())}")
+    return ";".join(declarations)
+
+
+def _minify_segment(segment):
+    segment = COMMENT_RE.sub("", segment)
+    segment = WHITESPACE_RE.sub(" ", segment)
+    segment = BLOCK_TAG_RE.sub(r"\1", segment)
+    return STYLE_ATTR_RE.sub(lambda m: f" style={m.group(1)}{_normalize_style(m.group(2))}{m.group(1)}", segment)
+
+
+def _dedupe_styles(html, min_count=3, min_length=40):
+    """
+    Hoists inline style blocks repeated `min_count`+ times into one <style> block with short classes.
+    Only for clients that honour embedded <style> (Gmail, Apple Mail); inline styles are the safe default.
+    """
+    counts = Counter(m.group(2) for m in STYLE_ATTR_RE.finditer(html))
+    shared = [style for style, n in counts.most_common() if n >= min_count and len(style) >= min_length]
+    if not shared:
+        return html
+    classes = {style: f"pd{i}" for i, style in enumerate(shared)}
+
+    def replace_tag(match):
+        tag, attrs = match.group(1), match.group(2)
+        style = STYLE_ATTR_RE.search(attrs)
+        if not style or style.group(2) not in classes or re.search(r"\sclass\s*=", attrs, re.IGNORECASE):
+            return match.group(0)
+        attrs = attrs[:style.start()] + f' class="{classes[style.group(2)]}"' + attrs[style.end():]
+        return f"<{tag}{attrs}>"
+
+    parts = PRESERVE_RE.split(html)
+    out = []
+    # split() with 2 groups yields [text, block, tagname, text, block, tagname, ...]
+    for i, part in enumerate(parts):
+        if i % 3 == 0:
+            out.append(TAG_RE.sub(replace_tag, part))
+        elif i % 3 == 1:
+            out.append(part)
+    css = "".join(f".{name}{{{style}}}" for style, name in classes.items())
+    return f"<style>{css}</style>" + "".join(out)
+
+
+def minify_html(content, dedupe_styles=False):
+    """
+    Shrinks an email body before it is cached (and then sent once per student).
+    Returns (content, stats) with stats = {'before': bytes, 'after': bytes, 'saved_pct': float}.
+    Non-HTML content (e.g. quiz JSON) only has its fences stripped.
+    """
+    before = len(content.encode("utf-8"))
+    content = strip_fences(content).strip()
+
+    if looks_like_html(content):
+        parts = PRESERVE_RE.split(content)
+        out = []
+        for i, part in enumerate(parts):
+            if i % 3 == 0:
+                out.append(_minify_segment(part))
+            elif i % 3 == 1:
+                out.append(part)
+        content = "".join(out).strip()
+        if dedupe_styles:
+            content = _dedupe_styles(content)
+
+    after = len(content.encode("utf-8"))
+    saved = (1 - after / before) * 100 if before else 0.0
+    return content, {"before": before, "after": after, "saved_pct": round(saved, 1)}
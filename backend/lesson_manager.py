@@ -1,47 +1,153 @@
 import os
 import logging
 import re
-import json
+from backend.html_minifier import minify_html
+from backend.history_context import build_history, RECENT_DAYS, TOKEN_BUDGET
+from backend.file_lock import SingleFlight, LockTimeout, atomic_write, temp_path
+from backend.content_cache import CONTENT_CACHE
+from backend.topic_log import get_topic_log
+from backend.content_store import get_store
+from backend.remote_cache import get_remote_cache
 
 class LessonManager:
-    def __init__(self, lessons_dir="lessons"):
+    def __init__(self, lessons_dir="lessons", minify=True, dedupe_styles=False, lock_timeout=300, content_cache=None,
+                 store=None, remote=None):
         self.lessons_dir = lessons_dir
-        self.topics_file = os.path.join(lessons_dir, "topics.json")
+        # None: one HTML file per item (default); else a SQLiteContentStore (see content_store.py)
+        self.store = store
+        # Optional durable tier behind the local cache (see remote_cache.py): read-through, write-through
+        self.remote = remote
+        # Shrink content once at save time; it is sent once per student afterwards
+        self.minify = minify
+        self.dedupe_styles = dedupe_styles
+        # One generation per (day, type) at a time across threads and processes (dashboard + bot)
+        self.single_flight = SingleFlight(os.path.join(lessons_dir, ".locks"), timeout=lock_timeout)
+        # Decoded files shared process-wide (every Streamlit session), revalidated by mtime/size
+        self.content_cache = content_cache or CONTENT_CACHE
         
         if not os.path.exists(lessons_dir):
             os.makedirs(lessons_dir)
-            
-        # Ensure topics file exists
-        if not os.path.exists(self.topics_file):
-            with open(self.topics_file, "w") as f:
-                json.dump({}, f)
+
+        # Append-only topics.log with an in-memory day index (migrates an old topics.json once),
+        # or the store's topic column
+        self.topics = store if store is not None else get_topic_log(lessons_dir)
+
+    @classmethod
+    def from_config(cls, config, lessons_dir="lessons"):
+        return cls(
+            lessons_dir,
+            minify=config.get('minify_html', True),
+            dedupe_styles=config.get('minify_dedupe_styles', False),
+            lock_timeout=config.get('generation_lock_timeout', 300),
+            store=get_store(config, lessons_dir),
+            remote=get_remote_cache(config),
+        )
 
     def _get_path(self, day, type="lesson"):
         filename = f"day_{day}_{type}.html"
         return os.path.join(self.lessons_dir, filename)
 
+    def _prepare(self, content, label):
+        """Strips ``` fences and minifies HTML before caching. Logs the size before/after."""
+        if not self.minify:
+            return content
+        content, stats = minify_html(content, dedupe_styles=self.dedupe_styles)
+        logging.info(f"Minified {label}: {stats['before']} -> {stats['after']} bytes ({stats['saved_pct']}% saved)")
+        return content
+
+    def _path(self, type, key):
+        if type == "motivation":
+            return os.path.join(self.lessons_dir, f"motivation_{key}.html")
+        return self._get_path(key, type)
+
+    def _read_local(self, type, key):
+        if self.store is not None:
+            return self.store.get(type, key)
+        return self.content_cache.read(self._path(type, key))
+
+    def _write_local(self, type, key, content, model=None):
+        """Store row, or temp file + rename: Streamlit readers never see a half-written file."""
+        if self.store is not None:
+            self.store.put(type, key, content, model=model)
+            return
+        path = self._path(type, key)
+        atomic_write(path, content)
+        self.content_cache.invalidate(path)
+
+    def _read(self, type, key):
+        content = self._read_local(type, key)
+        if content is not None or self.remote is None:
+            return content
+        # Read-through: a fresh runner pulls what an earlier run generated, then keeps it locally
+        content = self.remote.get(type, key)
+        if content is not None:
+            logging.info(f"Remote Cache Hit: {type} {key}.")
+            self._write_local(type, key, content)
+            if type == "lesson":
+                self._extract_and_update_topic(key, content)
+        return content
+
+    def _write(self, type, key, content, model=None):
+        self._write_local(type, key, content, model)
+        if self.remote is not None:
+            self.remote.put(type, key, content, model=model)
+
     def get_lesson(self, day):
         """Returns cached lesson content or None if not found."""
-        path = self._get_path(day, "lesson")
-        if os.path.exists(path):
-            logging.info(f"Cache Hit: Loading Day {day} Lesson from file.")
-            with open(path, "r", encoding="utf-8") as f:
-                return f.read()
-        return None
+        content = self._read("lesson", day)
+        if content is not None:
+            logging.debug(f"Cache Hit: Day {day} Lesson.")
+        return content
 
-    def save_lesson(self, day, content):
+    def save_lesson(self, day, content, model=None):
         """Saves generated lesson to cache AND extracts/saves topic."""
         # 1. Save HTML File
-        path = self._get_path(day, "lesson")
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(content)
+        content = self._prepare(content, f"Day {day} Lesson")
+        self._write("lesson", day, content, model)
         logging.info(f"Cache Saved: Day {day} Lesson.")
         
         # 2. Extract & Save Topic
         self._extract_and_update_topic(day, content)
 
+    def stream_lesson(self, day, chunks, model=None):
+        """
+        Writes a streamed lesson through to a day_N_lesson.html.*.partial file and yields the text received so far.
+        When the stream ends the (minified) lesson replaces the cache entry in one os.replace,
+        so get_lesson() never sees half a lesson. A failed or abandoned stream leaves no entry behind.
+        With a content store the text is only buffered and saved as one row at the end.
+        """
+        if self.store is not None:
+            received = []
+            for chunk in chunks:
+                received.append(chunk)
+                yield "".join(received)
+            self.save_lesson(day, "".join(received), model)
+            return
+
+        path = self._get_path(day, "lesson")
+        partial_path = temp_path(path)
+        received = []
+        try:
+            with open(partial_path, "w", encoding="utf-8") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    f.flush()
+                    received.append(chunk)
+                    yield "".join(received)
+
+            content = self._prepare("".join(received), f"Day {day} Lesson")
+            os.remove(partial_path)
+            self._write("lesson", day, content, model)
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+        logging.info(f"Cache Saved: Day {day} Lesson (streamed).")
+
+        self._extract_and_update_topic(day, content)
+
     def _extract_and_update_topic(self, day, content):
-        """Finds <!-- TOPIC: ... --> and updates topics.json"""
+        """Finds <!-- TOPIC: ... --> and appends it to the topics log"""
         match = re.search(r"<!--\s*TOPIC:\s*(.*?)\s*-->", content, re.IGNORECASE)
         topic = "General Python"
         if match:
@@ -50,60 +156,73 @@ class LessonManager:
         else:
             logging.warning(f"No TOPIC tag found for Day {day}. Using default.")
             
-        # Update JSON
+        self.topics.set(day, topic)
+
+    def generation_lock(self, key, type="lesson"):
+        """Context manager held while generating `type` content for `key` (a day, or a date for motivation)."""
+        return self.single_flight.lock(f"{type}_{key}")
+
+    def get_or_create(self, key, generate, type="lesson", model=None):
+        """
+        Returns cached content for `key`, calling `generate()` and saving its result on a miss.
+        Concurrent callers for the same key (other threads, the bot, another dashboard session)
+        wait for the one in flight and reuse what it saved instead of making a duplicate LLM call.
+        Errors from `generate()` propagate; the next waiter then gets its own attempt.
+        """
+        get, save = {
+            "lesson": (self.get_lesson, self.save_lesson),
+            "reminder": (self.get_reminder, self.save_reminder),
+            "motivation": (self.get_motivation, self.save_motivation),
+        }[type]
+        content = get(key)
+        if content:
+            return content
+
         try:
-            with open(self.topics_file, "r") as f:
-                data = json.load(f)
-        except:
-            data = {}
-            
-        data[str(day)] = topic
-        
-        with open(self.topics_file, "w") as f:
-            json.dump(data, f, indent=2)
+            with self.generation_lock(key, type) as lock:
+                content = get(key)
+                if content:
+                    logging.info(f"Reused {type} for {key} generated by a concurrent request (waited {lock.waited:.1f}s).")
+                    return content
+                content = generate()
+                save(key, content, model)
+                return get(key) or content
+        except LockTimeout as e:
+            logging.warning(f"{e}; generating {type} for {key} without the lock.")
+            content = generate()
+            save(key, content, model)
+            return content
 
-    def get_topics_history(self, up_to_day):
-        """Returns list of topics up to specific day."""
+    def get_topics_history(self, up_to_day, recent_days=RECENT_DAYS, token_budget=TOKEN_BUDGET):
+        """
+        Returns the covered-topics context up to a specific day: recent days in full,
+        older phases summarized, capped at `token_budget` (see history_context.build_history).
+        """
         try:
-            with open(self.topics_file, "r") as f:
-                data = json.load(f)
-            
-            topics = []
-            for d, t in data.items():
-                if int(d) <= int(up_to_day):
-                    topics.append(f"Day {d}: {t}")
-            return "; ".join(topics)
+            return build_history(up_to_day, self.topics.upto(up_to_day), recent_days=recent_days, token_budget=token_budget)
         except Exception as e:
             logging.error(f"Error reading history: {e}")
             return "Basic Python Concepts"
 
     def get_reminder(self, day):
-        path = self._get_path(day, "reminder")
-        if os.path.exists(path):
-            logging.info(f"Cache Hit: Loading Day {day} Reminder from file.")
-            with open(path, "r", encoding="utf-8") as f:
-                return f.read()
-        return None
-
-    def save_reminder(self, day, content):
-        path = self._get_path(day, "reminder")
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(content)
+        content = self._read("reminder", day)
+        if content is not None:
+            logging.debug(f"Cache Hit: Day {day} Reminder.")
+        return content
+
+    def save_reminder(self, day, content, model=None):
+        content = self._prepare(content, f"Day {day} Reminder")
+        self._write("reminder", day, content, model)
         logging.info(f"Cache Saved: Day {day} Reminder.")
 
     def get_motivation(self, date_str):
         """Returns cached motivation for a specific date (YYYY-MM-DD)."""
-        filename = f"motivation_{date_str}.html"
-        path = os.path.join(self.lessons_dir, filename)
-        if os.path.exists(path):
-            logging.info(f"Cache Hit: Loading Motivation for {date_str}.")
-            with open(path, "r", encoding="utf-8") as f:
-                return f.read()
-        return None
-
-    def save_motivation(self, date_str, content):
-        filename = f"motivation_{date_str}.html"
-        path = os.path.join(self.lessons_dir, filename)
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(content)
+        content = self._read("motivation", date_str)
+        if content is not None:
+            logging.debug(f"Cache Hit: Motivation for {date_str}.")
+        return content
+
+    def save_motivation(self, date_str, content, model=None):
+        content = self._prepare(content, f"Motivation {date_str}")
+        self._write("motivation", date_str, content, model)
         logging.info(f"Cache Saved: Motivation for {date_str}.")
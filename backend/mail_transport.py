@@ -0,0 +1,153 @@
+import os
+import time
+import uuid
+import random
+import smtplib
+import logging
+import threading
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAPTURE_DIR = os.path.join(DATA_DIR, 'mail_capture')
+
+# Transports hand out "connections" with the two smtplib.SMTP methods EmailService uses:
+#   sendmail(from_addr, to_addrs, raw_message) and quit()
+
+
+class SMTPTransport:
+    """Real delivery over SMTP + STARTTLS (the original Gmail behaviour)."""
+    name = "smtp"
+    requires_credentials = True
+
+    def __init__(self, host="smtp.gmail.com", port=587, username="", password=""):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+
+    def open(self):
+        server = smtplib.SMTP(self.host, self.port)
+        server.starttls()
+        server.login(self.username, self.password)
+        return server
+
+
+class _FileCaptureConnection:
+    def __init__(self, transport):
+        self.transport = transport
+
+    def sendmail(self, from_addr, to_addrs, raw_message):
+        self.transport.write(from_addr, to_addrs, raw_message)
+        return {}
+
+    def quit(self):
+        pass
+
+
+class FileCaptureTransport:
+    """
+    Writes every message as an .eml file into a maildir-style folder (tmp/ -> new/).
+    Nothing leaves the machine, so cycles can run offline and the output can be inspected.
+    """
+    name = "file"
+    requires_credentials = False
+
+    def __init__(self, directory=CAPTURE_DIR):
+        self.directory = directory
+        for sub in ('tmp', 'new'):
+            os.makedirs(os.path.join(directory, sub), exist_ok=True)
+
+    def open(self):
+        return _FileCaptureConnection(self)
+
+    def write(self, from_addr, to_addrs, raw_message):
+        if isinstance(raw_message, str):
+            raw_message = raw_message.encode('utf-8')
+        filename = f"{time.time():.6f}.{uuid.uuid4().hex}.eml"
+        envelope = f"X-Envelope-From: {from_addr}\r\nX-Envelope-To: {', '.join(to_addrs)}\r\n".encode('utf-8')
+        tmp_path = os.path.join(self.directory, 'tmp', filename)
+        with open(tmp_path, 'wb') as f:
+            f.write(envelope + raw_message)
+        os.replace(tmp_path, os.path.join(self.directory, 'new', filename))
+
+    def count(self):
+        return len(os.listdir(os.path.join(self.directory, 'new')))
+
+
+class _SinkConnection:
+    def __init__(self, transport):
+        self.transport = transport
+
+    def sendmail(self, from_addr, to_addrs, raw_message):
+        return self.transport.accept(from_addr, to_addrs, raw_message)
+
+    def quit(self):
+        pass
+
+
+class SinkTransport:
+    """
+    In-process SMTP sink for load testing.
+    - `latency`: seconds added to every transaction (simulates network round trips)
+    - `failure_rate`: share of transactions rejected with a transient 451
+    - `throttle_rate`: share of transactions rejected with a 421 throttle reply
+    Accepted messages are kept in memory (`messages`) and counted in `stats`.
+    """
+    name = "sink"
+    requires_credentials = False
+
+    def __init__(self, latency=0.0, failure_rate=0.0, throttle_rate=0.0, seed=None, keep_messages=True):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.throttle_rate = throttle_rate
+        self.keep_messages = keep_messages
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.stats = {"transactions": 0, "recipients": 0, "bytes": 0, "failures": 0, "throttled": 0}
+
+    def open(self):
+        return _SinkConnection(self)
+
+    def accept(self, from_addr, to_addrs, raw_message):
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            roll = self.random.random()
+            if roll < self.throttle_rate:
+                self.stats['throttled'] += 1
+                raise smtplib.SMTPResponseException(421, b"4.7.0 Try again later (sink throttle)")
+            if roll < self.throttle_rate + self.failure_rate:
+                self.stats['failures'] += 1
+                raise smtplib.SMTPResponseException(451, b"4.3.0 Temporary failure (sink)")
+
+            self.stats['transactions'] += 1
+            self.stats['recipients'] += len(to_addrs)
+            self.stats['bytes'] += len(raw_message)
+            if self.keep_messages:
+                self.messages.append((from_addr, list(to_addrs), raw_message))
+        return {}
+
+
+def get_transport(config):
+    """Picks the mail backend from data_manager.get_config() ('mail_transport': smtp | file | sink)."""
+    kind = config.get('mail_transport', 'smtp')
+
+    if kind == 'file':
+        return FileCaptureTransport(config.get('mail_capture_dir', CAPTURE_DIR))
+    if kind == 'sink':
+        return SinkTransport(
+            latency=config.get('mail_sink_latency', 0.0),
+            failure_rate=config.get('mail_sink_failure_rate', 0.0),
+            throttle_rate=config.get('mail_sink_throttle_rate', 0.0),
+            seed=config.get('mail_sink_seed'),
+        )
+    if kind != 'smtp':
+        logging.warning(f"Unknown mail_transport '{kind}', falling back to SMTP.")
+
+    return SMTPTransport(
+        host=config.get('smtp_server', 'smtp.gmail.com'),
+        port=config.get('smtp_port', 587),
+        username=config.get('email_address'),
+        password=config.get('email_password'),
+    )
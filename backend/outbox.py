@@ -0,0 +1,281 @@
+import os
+import time
+import asyncio
+import uuid
+import random
+import smtplib
+import sqlite3
+import logging
+import contextlib
+from backend.email_service import DELIVERY_SENT, DELIVERY_FAILED, DELIVERY_RETRY
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTBOX_FILE = os.path.join(DATA_DIR, 'outbox.db')
+
+QUEUED = 'queued'
+SENT = DELIVERY_SENT
+FAILED = DELIVERY_FAILED
+RETRYING = DELIVERY_RETRY
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    subject TEXT NOT NULL,
+    html TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    message_id TEXT NOT NULL REFERENCES messages(id),
+    email TEXT NOT NULL,
+    name TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (message_id, email)
+);
+CREATE INDEX IF NOT EXISTS idx_deliveries_state ON deliveries(message_id, state, next_attempt_at);
+"""
+
+
+class Outbox:
+    """
+    Durable outbox backed by a local SQLite file.
+    Every enqueued message gets an id and one delivery row per recipient
+    (queued -> sent | failed | retrying), so callers can act only on the recipients that were delivered.
+    """
+
+    def __init__(self, path=OUTBOX_FILE, max_attempts=4, base_delay=15, max_delay=300, reuse_window=6 * 3600):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Deliveries left queued/retrying longer than this are expired instead of joining a later send
+        self.reuse_window = reuse_window
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            max_attempts=config.get('outbox_max_attempts', 4),
+            base_delay=config.get('outbox_retry_delay', 15),
+            reuse_window=config.get('outbox_reuse_window', 6 * 3600),
+        )
+
+    @contextlib.contextmanager
+    def _conn(self):
+        # New connection per operation keeps the outbox safe to use from several threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _backoff(self, attempts):
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    # --- Queue ---
+
+    def enqueue(self, recipient_list, subject, html_content):
+        """
+        Stores a message for a list of recipients. Returns the message id.
+        If a message with the same content still has recipients queued/retrying (e.g. the dashboard
+        stopped waiting), the new recipients join it (keeping its subject), so those retries go out
+        with this send instead of being dropped or duplicated. Every recipient passed in is queued
+        again, even one already sent on that message: the caller asked for it. Pending rows older than
+        `reuse_window` are expired first, so a stale message is never picked up.
+        """
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE deliveries SET state = ?, last_error = 'Retry window elapsed: ' || COALESCE(last_error, ''), "
+                "updated_at = ? WHERE state IN (?, ?) AND updated_at < ?",
+                (FAILED, now, QUEUED, RETRYING, now - self.reuse_window)
+            )
+            pending = conn.execute(
+                "SELECT m.id FROM messages m JOIN deliveries d ON d.message_id = m.id "
+                "WHERE m.html = ? AND d.state IN (?, ?) ORDER BY m.created_at DESC LIMIT 1",
+                (html_content, QUEUED, RETRYING)
+            ).fetchone()
+            if pending:
+                message_id = pending['id']
+            else:
+                message_id = uuid.uuid4().hex
+                conn.execute("INSERT INTO messages (id, subject, html, created_at) VALUES (?, ?, ?, ?)",
+                             (message_id, subject, html_content, now))
+            # Finished rows (sent or failed) on a reused message start over; pending ones keep their schedule
+            conn.executemany(
+                "INSERT INTO deliveries (message_id, email, name, state, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(message_id, email) DO UPDATE SET state = excluded.state, attempts = 0, "
+                "next_attempt_at = 0, last_error = NULL, updated_at = excluded.updated_at "
+                "WHERE deliveries.state IN (?, ?)",
+                [(message_id, r['email'], r.get('name'), QUEUED, now, SENT, FAILED) for r in recipient_list]
+            )
+        logging.info(f"Outbox: queued message {message_id} for {len(recipient_list)} recipients.")
+        return message_id
+
+    def _due(self, conn, message_id, now):
+        return conn.execute(
+            "SELECT email, name, attempts FROM deliveries WHERE message_id = ? AND state IN (?, ?) AND next_attempt_at <= ?",
+            (message_id, QUEUED, RETRYING, now)
+        ).fetchall()
+
+    def _next_retry_at(self, conn, message_id):
+        row = conn.execute(
+            "SELECT MIN(next_attempt_at) FROM deliveries WHERE message_id = ? AND state = ?",
+            (message_id, RETRYING)
+        ).fetchone()
+        return row[0]
+
+    def _record(self, message_id, rows, results):
+        """Stores one attempt's results. Returns the emails it marked sent."""
+        now = time.time()
+        updates = []
+        for row in rows:
+            state, detail = results.get(row['email'], (RETRYING, "No result from mailer"))
+            attempts = row['attempts'] + 1
+            next_at = 0
+            if state == RETRYING:
+                if attempts >= self.max_attempts:
+                    state = FAILED
+                    detail = f"Gave up after {attempts} attempts: {detail}"
+                else:
+                    next_at = now + self._backoff(attempts)
+            updates.append((state, attempts, next_at, None if state == SENT else detail, now, message_id, row['email']))
+
+        with self._conn() as conn:
+            conn.executemany(
+                "UPDATE deliveries SET state = ?, attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ? "
+                "WHERE message_id = ? AND email = ?",
+                updates
+            )
+        return [u[-1] for u in updates if u[0] == SENT]
+
+    def _load(self, message_id):
+        with self._conn() as conn:
+            message = conn.execute("SELECT subject, html FROM messages WHERE id = ?", (message_id,)).fetchone()
+        if not message:
+            raise KeyError(f"Unknown outbox message: {message_id}")
+        return message
+
+    def _poll(self, message_id, deadline, expire=True):
+        """
+        Returns (rows, wait): rows due now, or how long to sleep before the next retry.
+        (no rows, None) means we are done: finished, or the next retry is past `deadline`
+        (those rows are marked failed when `expire`, otherwise left retrying for a later send).
+        """
+        now = time.time()
+        with self._conn() as conn:
+            rows = self._due(conn, message_id, now)
+            if rows:
+                return rows, None
+            next_retry = self._next_retry_at(conn, message_id)
+        if next_retry is None:
+            return [], None
+        if next_retry > deadline:
+            if expire:
+                self._expire(message_id)
+            return [], None
+        return [], max(0, next_retry - now)
+
+    def _failure_results(self, message_id, rows, error):
+        if isinstance(error, (ValueError, smtplib.SMTPAuthenticationError)):
+            # Missing/bad credentials won't fix themselves between retries
+            logging.error(f"Outbox: cannot send {message_id}: {error}")
+            return {r['email']: (FAILED, str(error)) for r in rows}
+        logging.error(f"Outbox: batch send failed for {message_id}: {error}")
+        return {r['email']: (RETRYING, str(error)) for r in rows}
+
+    def _finish(self, message_id, sent):
+        counts = self.counts(message_id)
+        logging.info(f"Outbox: message {message_id} -> {counts} ({len(sent)} sent this run)")
+        return sent
+
+    def deliver(self, message_id, mailer, max_wait=600, broadcast=False, expire=True):
+        """
+        Sends all due recipients of a message, retrying transient failures with backoff.
+        `broadcast` is passed through to the mailer (Bcc fan-out for non-personalized content).
+        Waits for retries for at most `max_wait` seconds; anything still retrying after that is marked
+        failed, or with expire=False left in the outbox for the next send of the same message.
+        Returns the recipient emails delivered by this call (not ones sent earlier on the same message).
+        """
+        deadline = time.time() + max_wait
+        message = self._load(message_id)
+        sent = []
+
+        while True:
+            rows, wait = self._poll(message_id, deadline, expire)
+            if not rows:
+                if wait is None:
+                    break
+                time.sleep(wait)
+                continue
+
+            recipients = [{'email': r['email'], 'name': r['name']} for r in rows]
+            try:
+                results = mailer.send_batch(recipients, message['subject'], message['html'], broadcast=broadcast)
+            except Exception as e:
+                results = self._failure_results(message_id, rows, e)
+            sent += self._record(message_id, rows, results)
+
+        return self._finish(message_id, sent)
+
+    async def deliver_async(self, message_id, sender, max_wait=600, broadcast=False, expire=True):
+        """Same as deliver(), but sends through an AsyncMailer and sleeps without blocking the loop."""
+        deadline = time.time() + max_wait
+        message = self._load(message_id)
+        sent = []
+
+        while True:
+            rows, wait = self._poll(message_id, deadline, expire)
+            if not rows:
+                if wait is None:
+                    break
+                await asyncio.sleep(wait)
+                continue
+
+            recipients = [{'email': r['email'], 'name': r['name']} for r in rows]
+            try:
+                results = await sender.send_batch(recipients, message['subject'], message['html'], broadcast=broadcast)
+            except Exception as e:
+                results = self._failure_results(message_id, rows, e)
+            sent += self._record(message_id, rows, results)
+
+        return self._finish(message_id, sent)
+
+    def _expire(self, message_id):
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE deliveries SET state = ?, last_error = 'Retry window elapsed: ' || COALESCE(last_error, ''), updated_at = ? "
+                "WHERE message_id = ? AND state = ?",
+                (FAILED, time.time(), message_id, RETRYING)
+            )
+
+    # --- Inspection ---
+
+    def status(self, message_id):
+        """Returns {email: (state, attempts, last_error)} for a message."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT email, state, attempts, last_error FROM deliveries WHERE message_id = ?", (message_id,)
+            ).fetchall()
+        return {r['email']: (r['state'], r['attempts'], r['last_error']) for r in rows}
+
+    def counts(self, message_id):
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT state, COUNT(*) FROM deliveries WHERE message_id = ? GROUP BY state", (message_id,)
+            ).fetchall()
+        return {r[0]: r[1] for r in rows}
+
+    def sent_recipients(self, message_id):
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT email FROM deliveries WHERE message_id = ? AND state = ?", (message_id, SENT)
+            ).fetchall()
+        return [r['email'] for r in rows]
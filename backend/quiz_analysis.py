@@ -0,0 +1,144 @@
+import logging
+from collections import Counter
+import pandas as pd
+from backend.structured_output import repair_json, StructuredOutputError
+
+# Remedial feedback by mistake pattern: students who missed the same questions share one
+# generated tip, so LLM work scales with distinct patterns rather than class size.
+
+
+def answer_key(cache, day):
+    """
+    {question_id (str): question dict} from the cached quiz for `day` (LessonManager),
+    or None when the day has no parseable quiz (e.g. an HTML lesson or legacy content).
+    """
+    content = cache.get_lesson(day)
+    if not content:
+        return None
+    try:
+        data = repair_json(content)
+    except StructuredOutputError:
+        return None
+    if not isinstance(data, dict) or not data.get('questions'):
+        return None
+    return {str(q.get('id')): q for q in data['questions'] if isinstance(q, dict)}
+
+
+def _answers(answers_json):
+    """answers_json (dict or JSON text) -> {question_id (str): chosen option}."""
+    answers = answers_json
+    if not isinstance(answers, dict):
+        try:
+            answers = repair_json(answers_json or "{}")
+        except StructuredOutputError:
+            answers = {}
+    if not isinstance(answers, dict):
+        answers = {}
+    return {str(qid): value for qid, value in answers.items()}
+
+
+def wrong_pattern(answers_json, key):
+    """Sorted tuple of the question ids a student got wrong (unanswered counts as wrong)."""
+    answers = _answers(answers_json)
+    wrong = [qid for qid, q in key.items() if answers.get(qid) != q.get('answer')]
+    return tuple(sorted(wrong, key=lambda qid: (len(qid), qid)))
+
+
+def _overlap(a, b):
+    a, b = set(a), set(b)
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def cluster_results(results, key, max_clusters=8):
+    """
+    Groups quiz results by wrong-answer pattern.
+    Returns [{'pattern': (qids...), 'questions': [question dicts], 'results': [...]}], largest first.
+    Beyond `max_clusters`, the rarest patterns are folded into the most similar kept cluster,
+    whose tip then covers the questions most of its members missed.
+    """
+    groups = {}
+    for res in results:
+        groups.setdefault(wrong_pattern(res.get('answers_json'), key), []).append(res)
+
+    patterns = sorted(groups, key=lambda p: (-len(groups[p]), len(p), p))
+    kept, folded = patterns[:max_clusters], patterns[max_clusters:]
+    for pattern in folded:
+        target = max(kept, key=lambda p: _overlap(p, pattern))
+        groups[target].extend(groups.pop(pattern))
+
+    clusters = []
+    for pattern in kept:
+        members = groups[pattern]
+        # Questions missed by at least half the cluster (exactly the pattern for unfolded clusters)
+        misses = Counter(qid for res in members for qid in wrong_pattern(res.get('answers_json'), key))
+        pattern = tuple(qid for qid in key if misses[qid] * 2 >= len(members))
+        clusters.append({
+            'pattern': pattern,
+            'questions': [key[qid] for qid in pattern],
+            'results': members,
+        })
+    logging.info(f"Clustered {len(results)} quiz results into {len(clusters)} mistake patterns")
+    return clusters
+
+
+def score_results(results, key):
+    """
+    Scores every result against the answer key in one vectorized pass.
+    Returns (students, questions):
+    - students: one row per result (same order) with score, total and wrong ('Q2,Q5'; '' when all correct)
+    - questions: one row per question id with miss_rate (0-1) and top_wrong (the most chosen wrong option)
+    """
+    qids = list(key)
+    if not results:
+        return pd.DataFrame(columns=['score', 'total', 'wrong']), pd.DataFrame(columns=['miss_rate', 'top_wrong'])
+    answers = pd.DataFrame([_answers(r.get('answers_json')) for r in results], columns=qids)
+    correct = pd.Series({qid: key[qid].get('answer') for qid in qids})
+    wrong = answers.ne(correct)  # unanswered (NaN) counts as wrong
+
+    labels = pd.Series([f"Q{qid}," for qid in qids], index=qids, dtype=object)
+    students = pd.DataFrame({
+        'score': len(qids) - wrong.sum(axis=1),
+        'total': len(qids),
+        'wrong': wrong.astype(object).dot(labels).astype(str).str.rstrip(','),
+    })
+
+    top_wrong = {}
+    for qid in qids:
+        picks = answers.loc[wrong[qid], qid].dropna()
+        top_wrong[qid] = picks.value_counts().index[0] if not picks.empty else None
+    questions = pd.DataFrame({
+        'miss_rate': wrong.mean(axis=0),
+        'top_wrong': pd.Series(top_wrong),
+    }, index=qids)
+    return students, questions
+
+
+def question_summary(questions, key, max_chars=90):
+    """Compact per-question lines for the insights prompt, most missed first."""
+    lines = []
+    for qid, row in questions.sort_values('miss_rate', ascending=False).iterrows():
+        if row['miss_rate'] <= 0:
+            continue
+        q = key[qid]
+        text = str(q.get('question', ''))[:max_chars]
+        pick = f", common wrong pick: {row['top_wrong']}" if pd.notna(row['top_wrong']) else ""
+        lines.append(f"Q{qid} ({row['miss_rate']:.0%} missed{pick}; correct: {q.get('answer')}): {text}")
+    return "\n".join(lines) if lines else "Every question was answered correctly by everyone."
+
+
+def enrich_results(results, key):
+    """
+    Fills score/total/wrong_summary on each result (in place) from the bulk scoring and
+    returns the per-question summary text that goes into the insights prompt once.
+    """
+    if not results:
+        return ""
+    students, questions = score_results(results, key)
+    for res, (_, row) in zip(results, students.iterrows()):
+        res['score'] = int(row['score'])
+        res['total'] = int(row['total'])
+        res['wrong_summary'] = row['wrong'] or "none"
+    logging.info(f"Scored {len(results)} quiz results against {len(key)} questions")
+    return question_summary(questions, key)
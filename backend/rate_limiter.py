@@ -0,0 +1,258 @@
+import os
+import re
+import json
+import time
+import datetime
+import logging
+import threading
+from backend.file_lock import FileLock, atomic_write
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USAGE_FILE = os.path.join(DATA_DIR, 'mail_usage.json')
+
+# SMTP replies that mean "slow down" rather than "this address is bad".
+# A 5xx is only a throttle when its enhanced status code or wording says so
+# (Gmail: "5.4.5 Daily user sending limit exceeded"); ordinary rejections must not match.
+THROTTLE_CODES = (421, 454)
+# Explicit daily-quota signals: these close the day
+QUOTA_RE = re.compile(
+    r"(?<![\d.])5\.4\.5(?![\d.])"
+    r"|\bquota (?:exceeded|reached)\b"
+    r"|\bexceeded (?:the |your )?(?:daily )?(?:sending )?quota\b"
+    r"|\bsending (?:limit|quota) (?:exceeded|reached)\b",
+    re.IGNORECASE,
+)
+# Rate signals (including 5.7.1 "... rate limited"): slow down, but the day stays open
+RATE_RE = re.compile(
+    r"(?<![\d.])4\.7\.0(?![\d.])|\brate limit(?:ed|ing)?\b|\btoo many (?:messages|connections|recipients)\b",
+    re.IGNORECASE,
+)
+
+
+class QuotaExceeded(Exception):
+    """Raised when the daily sending budget is used up."""
+    pass
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` tokens, refilled evenly over `period` seconds.
+    """
+
+    def __init__(self, capacity, period):
+        self.capacity = float(capacity)
+        self.period = float(period)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.capacity / self.period)
+
+    def reserve(self, count=1):
+        """
+        Takes `count` tokens if available and returns 0.
+        Otherwise returns how many seconds to wait before trying again.
+        """
+        with self.lock:
+            self._refill()
+            if self.tokens >= count:
+                self.tokens -= count
+                return 0.0
+            missing = count - self.tokens
+            return missing * self.period / self.capacity
+
+    def acquire(self, count=1):
+        """Blocks until `count` tokens are taken. Returns seconds spent waiting."""
+        waited = 0.0
+        while True:
+            delay = self.reserve(count)
+            if delay <= 0:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+
+class RateLimiter:
+    """
+    Outbound mail limiter.
+    - Per-second and per-minute token buckets smooth out bursts.
+    - Per-day counter is persisted to disk so restarts still respect the provider cap. The file is
+      re-read under a lock before every increment, so the dashboard and the bot share one count.
+      It lives on local disk: on ephemeral runners (GitHub Actions) it starts at zero every job.
+    - Throttle replies (421/454, rate-limit 5xx) slow sending down; successes slowly speed it back up.
+      Only an explicit quota reply (5.4.5, "quota exceeded") closes the day.
+    """
+
+    def __init__(self, per_second=2, per_minute=60, per_day=500, usage_file=USAGE_FILE):
+        self.per_second = per_second
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.usage_file = usage_file
+        self.usage_lock = FileLock(f"{usage_file}.lock", timeout=10)
+
+        self.second_bucket = TokenBucket(per_second, 1) if per_second else None
+        self.minute_bucket = TokenBucket(per_minute, 60) if per_minute else None
+
+        # Adaptive slowdown: 1.0 = normal pace, doubles on every throttle reply
+        self.slowdown = 1.0
+        self.max_slowdown = 32.0
+        self.last_send = 0.0
+        self.lock = threading.Lock()
+
+        self.usage = self._load_usage()
+        self.metrics = {
+            "acquired": 0,
+            "wait_seconds": 0.0,
+            "throttle_events": 0,
+            "quota_blocks": 0,
+        }
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            per_second=config.get('email_rate_per_second', 2),
+            per_minute=config.get('email_rate_per_minute', 60),
+            per_day=config.get('email_rate_per_day', 500),
+        )
+
+    # --- Daily Usage (Persisted) ---
+
+    def _today(self):
+        return datetime.date.today().isoformat()
+
+    def _update_usage(self, change):
+        """Reloads the shared counter, applies `change(usage)` and saves, all under the usage file lock."""
+        with self.lock:
+            try:
+                with self.usage_lock:
+                    self.usage = self._load_usage()
+                    change(self.usage)
+                    self._save_usage()
+            except OSError as e:  # includes LockTimeout: keep counting in memory
+                logging.warning(f"Could not lock mail usage file: {e}")
+                if self.usage.get('date') != self._today():
+                    self.usage = {"date": self._today(), "count": 0}
+                change(self.usage)
+
+    def _load_usage(self):
+        try:
+            with open(self.usage_file, 'r') as f:
+                usage = json.load(f)
+        except:
+            usage = {}
+        if usage.get('date') != self._today():
+            usage = {"date": self._today(), "count": 0}
+        return usage
+
+    def _save_usage(self):
+        try:
+            # Atomic: remaining_today() reads without the lock
+            atomic_write(self.usage_file, json.dumps(self.usage))
+        except Exception as e:
+            logging.warning(f"Could not persist mail usage: {e}")
+
+    def remaining_today(self):
+        if not self.per_day:
+            return None
+        with self.lock:
+            # Another process (dashboard / bot) may have sent since we last looked
+            self.usage = self._load_usage()
+            return max(0, self.per_day - self.usage['count'])
+
+    # --- Acquire ---
+
+    def acquire(self, count=1):
+        """
+        Blocks until one more message may be sent.
+        Raises QuotaExceeded if the daily budget is exhausted: checked up front to fail fast, and again
+        atomically with the increment under the usage file lock.
+        """
+        remaining = self.remaining_today()
+        if remaining is not None and remaining < count:
+            self.metrics['quota_blocks'] += 1
+            raise QuotaExceeded(f"Daily sending limit reached ({self.per_day}/day)")
+
+        waited = 0.0
+        if self.second_bucket:
+            waited += self.second_bucket.acquire()
+        if self.minute_bucket:
+            waited += self.minute_bucket.acquire()
+
+        # Extra spacing while we are being throttled
+        if self.slowdown > 1.0 and self.per_second:
+            gap = (self.slowdown - 1.0) / self.per_second
+            delay = self.last_send + gap - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+                waited += delay
+
+        def reserve(usage):
+            # Check and increment in one critical section, so concurrent senders can't both take the last slot
+            if self.per_day and usage['count'] + count > self.per_day:
+                raise QuotaExceeded(f"Daily sending limit reached ({self.per_day}/day)")
+            usage['count'] += count
+
+        try:
+            self._update_usage(reserve)
+        except QuotaExceeded:
+            self.metrics['quota_blocks'] += 1
+            raise
+        with self.lock:
+            self.last_send = time.monotonic()
+            self.metrics['acquired'] += 1
+            self.metrics['wait_seconds'] += waited
+        return waited
+
+    # --- Feedback from SMTP ---
+
+    @staticmethod
+    def _text(message):
+        if isinstance(message, bytes):
+            message = message.decode('utf-8', errors='ignore')
+        return str(message)
+
+    @staticmethod
+    def is_quota(code, message=""):
+        """An explicit daily-quota reply (5.4.5 / "quota exceeded"), not just any rejection."""
+        return 400 <= code < 600 and bool(QUOTA_RE.search(RateLimiter._text(message)))
+
+    @staticmethod
+    def is_throttle(code, message=""):
+        if code in THROTTLE_CODES:
+            return True
+        if 400 <= code < 600:
+            text = RateLimiter._text(message)
+            return bool(QUOTA_RE.search(text) or RATE_RE.search(text))
+        return False
+
+    def on_throttle(self, code, message=""):
+        """Slows down and sleeps a cooldown. An explicit quota reply also closes the day."""
+        self.metrics['throttle_events'] += 1
+        self.slowdown = min(self.slowdown * 2, self.max_slowdown)
+
+        if self.per_day and self.is_quota(code, message):
+            def close_day(usage):
+                usage['count'] = max(usage['count'], self.per_day)
+
+            self._update_usage(close_day)
+            logging.warning(f"Provider reported daily quota exhausted: {message}")
+            return
+
+        cooldown = self.slowdown
+        logging.warning(f"SMTP throttle ({code}). Slowing down x{self.slowdown:g}, cooling off {cooldown:g}s.")
+        time.sleep(cooldown)
+        self.metrics['wait_seconds'] += cooldown
+
+    def on_success(self):
+        if self.slowdown > 1.0:
+            self.slowdown = max(1.0, self.slowdown * 0.9)
+
+    def summary(self):
+        m = self.metrics
+        return (f"Mail limiter: {m['acquired']} sent, {m['wait_seconds']:.1f}s waiting, "
+                f"{m['throttle_events']} throttles, {m['quota_blocks']} quota blocks, "
+                f"{self.remaining_today()} left today")
@@ -0,0 +1,154 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from backend.file_lock import atomic_write
+
+# Durable tier behind the local lessons/ cache, for runners that start with an empty disk
+# (GitHub Actions). LessonManager reads through it on a local miss and writes through on save.
+# config 'remote_cache': 'supabase' (table from supabase_content_cache.sql) | 'directory' (local stand-in)
+TABLE = "content_cache"
+TOPIC_RE = re.compile(r"<!--\s*TOPIC:\s*(.*?)\s*-->", re.IGNORECASE)
+
+
+def _row(type, key, content, model):
+    match = TOPIC_RE.search(content) if type == "lesson" else None
+    return {
+        "type": type,
+        "key": str(key),
+        "day": None if type == "motivation" else int(key),
+        "content": content,
+        "topic": match.group(1).strip() if match else None,
+        "model": model,
+        "hash": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+        "size": len(content.encode("utf-8")),
+    }
+
+
+class SupabaseRemoteCache:
+    """Rows in public.content_cache, keyed by (type, key). Needs the service-role client (RLS has no policies)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, type, key):
+        res = self.client.table(TABLE).select("content").eq("type", type).eq("key", str(key)).limit(1).execute()
+        return res.data[0]["content"] if res.data else None
+
+    def put(self, type, key, content, model=None):
+        self.client.table(TABLE).upsert(_row(type, key, content, model), on_conflict="type,key").execute()
+
+    def clear(self):
+        # PostgREST refuses an unfiltered DELETE; every row has a non-empty key
+        res = self.client.table(TABLE).delete().neq("key", "").execute()
+        return len(res.data or [])
+
+
+class DirectoryRemoteCache:
+    """Stand-in for tests and local runs: one JSON file per row in `path` (point it anywhere that persists)."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, type, key):
+        return os.path.join(self.path, f"{type}_{key}.json")
+
+    def get(self, type, key):
+        try:
+            with open(self._file(type, key), "r", encoding="utf-8") as f:
+                return json.load(f)["content"]
+        except FileNotFoundError:
+            return None
+
+    def put(self, type, key, content, model=None):
+        row = _row(type, key, content, model)
+        row["created_at"] = time.time()
+        atomic_write(self._file(type, key), json.dumps(row))
+
+    def clear(self):
+        count = 0
+        for filename in os.listdir(self.path):
+            if filename.endswith(".json"):
+                os.remove(os.path.join(self.path, filename))
+                count += 1
+        return count
+
+
+class RemoteTier:
+    """
+    Wraps a remote backend so it can never break a cycle: failures are logged and treated as misses.
+    Keeps hit/miss/error counts for the run summary.
+    """
+
+    def __init__(self, backend, name):
+        self.backend = backend
+        self.name = name
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+    def get(self, type, key):
+        try:
+            content = self.backend.get(type, key)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logging.warning(f"Remote cache ({self.name}) read failed for {type} {key}: {e}")
+            return None
+        self.stats['hits' if content else 'misses'] += 1
+        return content or None
+
+    def put(self, type, key, content, model=None):
+        try:
+            self.backend.put(type, key, content, model=model)
+            self.stats['writes'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            logging.warning(f"Remote cache ({self.name}) write failed for {type} {key}: {e}")
+
+    def clear(self):
+        """Deletes every remote row (for cache wipes / factory reset). Returns the count, or None on failure."""
+        try:
+            return self.backend.clear()
+        except Exception as e:
+            self.stats['errors'] += 1
+            logging.warning(f"Remote cache ({self.name}) clear failed: {e}")
+            return None
+
+    def summary(self):
+        s = self.stats
+        return (f"Remote cache ({self.name}): {s['hits']} hits / {s['misses']} misses, "
+                f"{s['writes']} writes, {s['errors']} errors")
+
+
+def _build(kind, config):
+    if kind == 'directory':
+        return DirectoryRemoteCache(config.get('remote_cache_dir', '.remote_cache'))
+    if kind == 'supabase':
+        # Service-role client only: SupabaseManager would also demand the anon SUPABASE_KEY,
+        # which the scheduler doesn't set
+        url = config.get('supabase_url') or os.getenv("SUPABASE_URL")
+        service_key = config.get('supabase_service_key') or os.getenv("SUPABASE_SERVICE_KEY")
+        if not url or not service_key:
+            logging.warning("Remote cache 'supabase' needs SUPABASE_URL and SUPABASE_SERVICE_KEY; continuing with the local cache only.")
+            return None
+        from supabase import create_client
+        return SupabaseRemoteCache(create_client(url, service_key))
+    logging.warning(f"Unknown remote_cache '{kind}'; continuing with the local cache only.")
+    return None
+
+
+def get_remote_cache(config):
+    """
+    RemoteTier from data_manager.get_config() ('remote_cache', 'remote_cache_dir', supabase_url/service_key),
+    or None when disabled. Never raises: a broken remote setup falls back to the local cache.
+    """
+    kind = config.get('remote_cache')
+    if not kind:
+        return None
+    try:
+        backend = _build(kind, config)
+    except Exception as e:
+        logging.warning(f"Remote cache ({kind}) unavailable, continuing with the local cache only: {e}")
+        return None
+    return RemoteTier(backend, kind) if backend is not None else None
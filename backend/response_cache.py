@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from backend.file_lock import atomic_write
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(DATA_DIR, '.gemini_cache')
+
+
+class ResponseCache:
+    """
+    Content-addressed disk cache for model responses.
+    - Key: sha256 of model name + system instruction + rendered prompt (+ any generation settings).
+    - Entries expire after `ttl_seconds` (overridable per lookup).
+    - Total size is bounded by `max_bytes`; least recently used entries (by file mtime) are evicted first.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl_seconds=7 * 24 * 3600, max_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "bytes_read": 0, "bytes_written": 0}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.total_bytes = sum(size for _, _, size in self._entries())
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            ttl_seconds=config.get('gemini_cache_ttl', 7 * 24 * 3600),
+            max_bytes=config.get('gemini_cache_max_mb', 50) * 1024 * 1024,
+        )
+
+    @staticmethod
+    def make_key(model_name, system_instruction, prompt, extra=""):
+        digest = hashlib.sha256()
+        for part in (model_name, system_instruction or "", prompt, extra):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _entries(self):
+        """Yields (path, mtime, size) for every cache file."""
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            yield path, st.st_mtime, st.st_size
+
+    def get(self, key, ttl=None):
+        """Returns the cached text or None. A hit refreshes the entry's LRU position."""
+        ttl = self.ttl_seconds if ttl is None else ttl
+        path = self._path(key)
+        with self.lock:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    raw = f.read()
+                entry = json.loads(raw)
+            except (OSError, ValueError):
+                self.stats['misses'] += 1
+                return None
+
+            if time.time() - entry.get('created_at', 0) > ttl:
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            os.utime(path, None)
+            self.stats['hits'] += 1
+            self.stats['bytes_read'] += len(raw)
+            return entry.get('text')
+
+    def put(self, key, text, model_name=""):
+        raw = json.dumps({"created_at": time.time(), "model": model_name, "text": text})
+        path = self._path(key)
+        with self.lock:
+            try:
+                old_size = os.path.getsize(path)
+            except OSError:
+                old_size = 0
+            try:
+                # Unique per process and thread: the bot and the dashboard share this directory
+                atomic_write(path, raw)
+            except OSError as e:
+                logging.warning(f"Response cache write failed: {e}")
+                return
+            size = len(raw.encode('utf-8'))
+            self.total_bytes += size - old_size
+            self.stats['bytes_written'] += size
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        self.total_bytes = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.total_bytes -= size
+            self.stats['evictions'] += 1
+
+    def summary(self):
+        s = self.stats
+        lookups = s['hits'] + s['misses']
+        rate = (s['hits'] / lookups * 100) if lookups else 0.0
+        return (f"Gemini cache: {s['hits']} hits / {s['misses']} misses ({rate:.0f}% hit rate), "
+                f"{s['bytes_read']} B read, {s['bytes_written']} B written, {s['evictions']} evictions, "
+                f"{self.total_bytes} B on disk")
@@ -0,0 +1,236 @@
+import re
+import ast
+import json
+from backend.html_minifier import strip_fences
+
+# Response schemas in the OpenAPI subset Gemini's structured output accepts
+# (passed as generation_config.response_schema) and validated locally by validate().
+QUIZ_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "title": {"type": "STRING"},
+        "questions": {
+            "type": "ARRAY",
+            "minItems": 1,
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "id": {"type": "INTEGER"},
+                    "question": {"type": "STRING"},
+                    "options": {"type": "ARRAY", "minItems": 2, "items": {"type": "STRING"}},
+                    "answer": {"type": "STRING"},
+                    "explanation": {"type": "STRING"},
+                },
+                "required": ["id", "question", "options", "answer", "explanation"],
+            },
+        },
+    },
+    "required": ["title", "questions"],
+}
+
+INSIGHTS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "student_feedback": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "email": {"type": "STRING"},
+                    "subject": {"type": "STRING"},
+                    "message": {"type": "STRING"},
+                },
+                "required": ["email", "subject", "message"],
+            },
+        },
+    },
+    "required": ["student_feedback"],
+}
+
+TIP_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "subject": {"type": "STRING"},
+        "message": {"type": "STRING"},
+    },
+    "required": ["subject", "message"],
+}
+
+JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+OPTION_LABEL_RE = re.compile(r"^[A-Da-d][).:]\s*")
+SMART_QUOTES = {"“": '"', "”": '"', "‘": "'", "’": "'"}
+
+
+class StructuredOutputError(ValueError):
+    """Model output could not be parsed/repaired into data matching the schema."""
+
+
+API_SCHEMA_KEYS = ("type", "format", "description", "nullable", "enum", "properties", "items", "required")
+
+
+def _api_schema(schema):
+    """The schema minus local-only keywords (e.g. minItems) the API would reject."""
+    out = {}
+    for key, value in schema.items():
+        if key not in API_SCHEMA_KEYS:
+            continue
+        if key == "properties":
+            value = {name: _api_schema(sub) for name, sub in value.items()}
+        elif key == "items":
+            value = _api_schema(value)
+        out[key] = value
+    return out
+
+
+def generation_config(schema):
+    """generation_config for a JSON response constrained to `schema`."""
+    return {"response_mime_type": "application/json", "response_schema": _api_schema(schema)}
+
+
+def validate(data, schema, path="$"):
+    """Returns a list of human-readable schema violations (empty when valid)."""
+    expected = schema.get("type", "").lower()
+    py_type = JSON_TYPES.get(expected)
+    if py_type and (not isinstance(data, py_type) or (expected in ("integer", "number") and isinstance(data, bool))):
+        return [f"{path}: expected {expected}, got {type(data).__name__}"]
+
+    errors = []
+    if expected == "object":
+        for key in schema.get("required", []):
+            if key not in data:
+                errors.append(f"{path}: missing '{key}'")
+        for key, sub in schema.get("properties", {}).items():
+            if key in data:
+                errors.extend(validate(data[key], sub, f"{path}.{key}"))
+    elif expected == "array":
+        if len(data) < schema.get("minItems", 0):
+            errors.append(f"{path}: expected at least {schema['minItems']} items")
+        if "items" in schema:
+            for i, item in enumerate(data):
+                errors.extend(validate(item, schema["items"], f"{path}[{i}]"))
+    if "enum" in schema and data not in schema["enum"]:
+        errors.append(f"{path}: {data!r} not in {schema['enum']}")
+    return errors
+
+
+def _close_brackets(text):
+    """Appends the closers a truncated JSON document is missing (ignores brackets inside strings)."""
+    stack = []
+    in_string = escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    text = TRAILING_COMMA_RE.sub(r"\1", text.rstrip().rstrip(","))
+    return text + "".join(reversed(stack))
+
+
+def repair_json(text):
+    """
+    Parses model output that is JSON or nearly so. Tries, in order: as-is, fences/prose stripped,
+    smart quotes and trailing commas fixed, Python literal syntax, truncated brackets closed.
+    Raises StructuredOutputError when nothing works.
+    """
+    if not isinstance(text, str):
+        return text
+    text = strip_fences(text).strip()
+    for smart, plain in SMART_QUOTES.items():
+        text = text.replace(smart, plain)
+    candidates = [text]
+
+    # Prose around the document: keep the outermost {...} / [...]
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    start = min(starts) if starts else 0
+    end = max(text.rfind("}"), text.rfind("]"))
+    body = text[start:end + 1] if end > start else text[start:]
+    if body != text:
+        candidates.append(body)
+    candidates += [TRAILING_COMMA_RE.sub(r"\1", c) for c in candidates]
+
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            pass
+    # Python literal syntax: single quotes, True/False/None
+    for candidate in candidates:
+        try:
+            data = ast.literal_eval(candidate)
+        except (ValueError, SyntaxError):
+            continue
+        if isinstance(data, (dict, list)):
+            return data
+    # Truncated output: close the open string/brackets
+    if starts:
+        try:
+            return json.loads(_close_brackets(text[start:]))
+        except ValueError:
+            pass
+    raise StructuredOutputError("Response is not valid JSON and could not be repaired")
+
+
+def fix_quiz(data):
+    """Domain fixes the schema can't express: sequential ids and answers that match an option exactly."""
+    if not isinstance(data, dict):
+        return data
+    for i, q in enumerate(data.get("questions", []), start=1):
+        if not isinstance(q, dict):
+            continue
+        if not isinstance(q.get("id"), int) or isinstance(q.get("id"), bool):
+            q["id"] = i
+        options = q.get("options") or []
+        answer = str(q.get("answer", "")).strip()
+        if options and answer not in options:
+            # "B", "B)", "b) 10" or the bare option text -> the matching option
+            letter = answer[:1].upper()
+            bare = OPTION_LABEL_RE.sub("", answer).lower()
+            for opt in options:
+                if not isinstance(opt, str):
+                    continue
+                if bare == OPTION_LABEL_RE.sub("", opt).lower() or (len(answer) <= 2 and opt[:1].upper() == letter):
+                    q["answer"] = opt
+                    break
+    return data
+
+
+def quiz_violations(data):
+    """Checks the schema can't express: every answer must be one of its options."""
+    return [f"$.questions[{i}]: answer not among options" for i, q in enumerate(data["questions"])
+            if q["answer"] not in q["options"]]
+
+
+def parse(text, schema, fixup=None, check=None):
+    """
+    Repairs + validates model output. `fixup(data)` normalizes known near-misses first;
+    `check(data)` returns extra violations. Returns the data; raises StructuredOutputError listing violations.
+    """
+    data = repair_json(text)
+    if fixup:
+        data = fixup(data)
+    errors = validate(data, schema)
+    if not errors and check:
+        errors = check(data)
+    if errors:
+        raise StructuredOutputError("; ".join(errors[:5]))
+    return data
@@ -0,0 +1,117 @@
+import os
+import json
+import bisect
+import logging
+import threading
+from backend.file_lock import FileLock, atomic_write
+
+# Topic history as an append-only log: one JSON line per saved lesson, {"day": n, "topic": "..."}.
+# A later line for the same day wins. Readers keep a sorted in-memory index that is loaded once
+# and then only reads the bytes appended since (by this or any other process).
+LOG_NAME = "topics.log"
+LEGACY_NAME = "topics.json"
+
+
+class TopicLog:
+    """
+    Append-only topics log with a sorted day index.
+    - set(): one O_APPEND write of a single line under the topics file lock, so concurrent writers
+      never interleave, clobber each other or race the migration.
+    - upto(day): topics for days <= day, found by bisect over the sorted day list.
+    - An existing topics.json is migrated into the log once (under a file lock) and renamed to .migrated.
+    """
+
+    def __init__(self, lessons_dir):
+        self.path = os.path.join(lessons_dir, LOG_NAME)
+        self.legacy_path = os.path.join(lessons_dir, LEGACY_NAME)
+        self.lock_path = os.path.join(lessons_dir, ".locks", "topics.lock")
+        self.lock = threading.Lock()
+        self.days = []     # sorted
+        self.topics = {}   # day -> topic
+        self.offset = 0    # bytes of the log already indexed
+        self.inode = None
+        self._migrate()
+
+    def _migrate(self):
+        if os.path.exists(self.path) or not os.path.exists(self.legacy_path):
+            return
+        with FileLock(self.lock_path, timeout=30):
+            if os.path.exists(self.path) or not os.path.exists(self.legacy_path):
+                return  # another process got there first
+            try:
+                with open(self.legacy_path, "r") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Could not read {self.legacy_path} for migration: {e}")
+                data = {}
+            lines = [json.dumps({"day": int(day), "topic": topic}) + "\n"
+                     for day, topic in sorted(data.items(), key=lambda item: int(item[0]))]
+            atomic_write(self.path, "".join(lines))
+            os.replace(self.legacy_path, f"{self.legacy_path}.migrated")
+            logging.info(f"Migrated {len(lines)} topics from {LEGACY_NAME} to {LOG_NAME}")
+
+    def _index(self, day, topic):
+        if day not in self.topics:
+            bisect.insort(self.days, day)
+        self.topics[day] = topic
+
+    def refresh(self):
+        """Indexes lines appended since the last call; reloads from scratch if the log was replaced or truncated."""
+        with self.lock:
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                st = None
+            if st is None or st.st_ino != self.inode or st.st_size < self.offset:
+                self.days, self.topics, self.offset = [], {}, 0
+                self.inode = st.st_ino if st else None
+            if st is None or st.st_size == self.offset:
+                return
+
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                chunk = f.read()
+            end = chunk.rfind(b"\n") + 1  # leave a half-written last line for the next refresh
+            for line in chunk[:end].splitlines():
+                try:
+                    entry = json.loads(line)
+                    self._index(int(entry["day"]), entry["topic"])
+                except (ValueError, KeyError, TypeError):
+                    logging.warning(f"Skipping malformed line in {LOG_NAME}: {line[:80]!r}")
+            self.offset += end
+
+    def set(self, day, topic):
+        line = (json.dumps({"day": int(day), "topic": topic}) + "\n").encode("utf-8")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with FileLock(self.lock_path, timeout=30):
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self.refresh()
+
+    def get(self, day):
+        self.refresh()
+        return self.topics.get(int(day))
+
+    def upto(self, day):
+        """{day: topic} for every logged day <= `day`."""
+        self.refresh()
+        with self.lock:
+            end = bisect.bisect_right(self.days, int(day))
+            return {d: self.topics[d] for d in self.days[:end]}
+
+
+_LOGS = {}
+_LOGS_LOCK = threading.Lock()
+
+
+def get_topic_log(lessons_dir):
+    """The process-wide TopicLog for `lessons_dir` (Streamlit builds a LessonManager per rerun)."""
+    key = os.path.abspath(lessons_dir)
+    with _LOGS_LOCK:
+        if key not in _LOGS:
+            _LOGS[key] = TopicLog(lessons_dir)
+        return _LOGS[key]
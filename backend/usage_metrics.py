@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USAGE_FILE = os.path.join(DATA_DIR, 'gemini_usage.jsonl')
+
+# USD per 1M tokens (Gemini Flash list prices); override with gemini_input_price / gemini_output_price
+DEFAULT_INPUT_PRICE = 0.30
+DEFAULT_OUTPUT_PRICE = 2.50
+# (input, output) by model family, most specific first; matched as a substring of the model name.
+# Anything unmatched is priced as Flash. Extend/override with config['gemini_prices'].
+MODEL_PRICES = {
+    "flash-lite": (0.10, 0.40),
+    "flash": (DEFAULT_INPUT_PRICE, DEFAULT_OUTPUT_PRICE),
+}
+# The JSONL is rotated to <file>.1 past this size; history reads both, so disk use stays under ~2x
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+
+
+def _token_counts(response):
+    """(prompt, output, total) tokens from a response's usage_metadata; zeros when the SDK omits it."""
+    usage = getattr(response, 'usage_metadata', None)
+    prompt = getattr(usage, 'prompt_token_count', 0) or 0
+    output = getattr(usage, 'candidates_token_count', 0) or 0
+    total = getattr(usage, 'total_token_count', 0) or (prompt + output)
+    return prompt, output, total
+
+
+def _p95(latencies):
+    if not latencies:
+        return 0.0
+    ordered = sorted(latencies)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2)
+
+
+class UsageTracker:
+    """
+    Token, latency and cost accounting for Gemini calls.
+    - Every API call is appended to a JSONL file (one line per call) for trends across days;
+      the file is rotated once it passes `max_bytes`.
+    - Costs use the price of the model that served the call (MODEL_PRICES).
+    - Rolling aggregates per (call_type, model) are kept in memory for the current process.
+    Thread-safe: the generation pool records from several worker threads.
+    """
+
+    def __init__(self, usage_file=USAGE_FILE, input_price=DEFAULT_INPUT_PRICE, output_price=DEFAULT_OUTPUT_PRICE,
+                 prices=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.usage_file = usage_file
+        self.input_price = input_price
+        self.output_price = output_price
+        self.prices = dict(MODEL_PRICES, flash=(input_price, output_price))
+        self.prices.update({family: tuple(price) for family, price in (prices or {}).items()})
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.totals = defaultdict(lambda: {
+            "calls": 0, "errors": 0, "cache_hits": 0, "prompt_tokens": 0, "output_tokens": 0,
+            "latency": 0.0, "max_latency": 0.0, "cost": 0.0, "recent": deque(maxlen=500),
+        })
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            input_price=config.get('gemini_input_price', DEFAULT_INPUT_PRICE),
+            output_price=config.get('gemini_output_price', DEFAULT_OUTPUT_PRICE),
+            prices=config.get('gemini_prices'),
+            max_bytes=config.get('gemini_usage_max_mb', 5) * 1024 * 1024,
+        )
+
+    def price(self, model_name):
+        """(input, output) USD per 1M tokens for a model name."""
+        # Longest family first, so 'flash-lite' wins over 'flash'
+        for family in sorted(self.prices, key=len, reverse=True):
+            if family in (model_name or ""):
+                return self.prices[family]
+        return self.input_price, self.output_price
+
+    def cost(self, prompt_tokens, output_tokens, model_name=None):
+        input_price, output_price = self.price(model_name)
+        return (prompt_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+    def record(self, call_type, model_name, latency, response=None, error=None):
+        """Records one API call. `response` supplies usage_metadata; `error` marks a failed attempt."""
+        prompt, output, total = _token_counts(response)
+        cost = self.cost(prompt, output, model_name)
+        entry = {
+            "ts": time.time(),
+            "call_type": call_type,
+            "model": model_name,
+            "latency": round(latency, 3),
+            "prompt_tokens": prompt,
+            "output_tokens": output,
+            "total_tokens": total,
+            "cost": round(cost, 6),
+            "error": getattr(error, 'kind', type(error).__name__) if error is not None else None,
+        }
+
+        with self.lock:
+            agg = self.totals[(call_type, model_name)]
+            agg['calls'] += 1
+            agg['errors'] += 1 if error is not None else 0
+            agg['prompt_tokens'] += prompt
+            agg['output_tokens'] += output
+            agg['latency'] += latency
+            agg['max_latency'] = max(agg['max_latency'], latency)
+            agg['recent'].append(latency)
+            agg['cost'] += cost
+            try:
+                self._rotate()
+                with open(self.usage_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                logging.warning(f"Could not write usage metrics: {e}")
+
+    def _rotate(self):
+        # os.replace is atomic, and writers reopen the file per line, so the bot and dashboard can share it
+        try:
+            if os.path.getsize(self.usage_file) < self.max_bytes:
+                return
+        except OSError:
+            return
+        os.replace(self.usage_file, f"{self.usage_file}.1")
+
+    def record_cache_hit(self, call_type, model_name):
+        with self.lock:
+            self.totals[(call_type, model_name)]['cache_hits'] += 1
+
+    def rows(self):
+        """Per (call_type, model) aggregates for this process, slowest first."""
+        with self.lock:
+            rows = []
+            for (call_type, model_name), agg in self.totals.items():
+                calls = agg['calls']
+                rows.append({
+                    "call_type": call_type,
+                    "model": model_name,
+                    "calls": calls,
+                    "errors": agg['errors'],
+                    "cache_hits": agg['cache_hits'],
+                    "prompt_tokens": agg['prompt_tokens'],
+                    "output_tokens": agg['output_tokens'],
+                    "avg_latency": round(agg['latency'] / calls, 2) if calls else 0.0,
+                    "p95_latency": _p95(agg['recent']),
+                    "max_latency": round(agg['max_latency'], 2),
+                    "cost": round(agg['cost'], 4),
+                })
+        return sorted(rows, key=lambda r: r['avg_latency'], reverse=True)
+
+    def summary(self):
+        rows = self.rows()
+        if not rows:
+            return "Gemini usage: no API calls"
+        calls = sum(r['calls'] for r in rows)
+        hits = sum(r['cache_hits'] for r in rows)
+        prompt = sum(r['prompt_tokens'] for r in rows)
+        output = sum(r['output_tokens'] for r in rows)
+        cost = sum(r['cost'] for r in rows)
+        parts = [f"{r['call_type']} ({r['model']}): {r['calls']} calls, avg {r['avg_latency']}s, p95 {r['p95_latency']}s"
+                 for r in rows if r['calls']]
+        return (f"Gemini usage: {calls} calls ({hits} cache hits), {prompt} prompt + {output} output tokens, "
+                f"~${cost:.4f}" + (f" | {'; '.join(parts)}" if parts else ""))
+
+    def _read(self, days):
+        """Entries from the last `days` days, across the rotated file and the current one."""
+        cutoff = time.time() - days * 86400
+        entries = []
+        for path in (f"{self.usage_file}.1", self.usage_file):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        if entry.get('ts', 0) >= cutoff:
+                            entries.append(entry)
+            except OSError:
+                continue
+        return entries
+
+    def history(self, days=14):
+        """(daily_history, route_history) from a single pass over the metrics file."""
+        entries = self._read(days)
+        return self._daily(entries), self._routes(entries)
+
+    def daily_history(self, days=14):
+        """Per-day totals from the metrics file (newest last): [{'date', 'calls', 'errors', 'tokens', 'cost', 'avg_latency'}]."""
+        return self._daily(self._read(days))
+
+    def route_history(self, days=14):
+        """Per (call_type, model) latency/tokens from the metrics file, for tuning the routing table."""
+        return self._routes(self._read(days))
+
+    @staticmethod
+    def _daily(entries):
+        per_day = defaultdict(lambda: {"calls": 0, "errors": 0, "tokens": 0, "cost": 0.0, "latency": 0.0})
+        for entry in entries:
+            day = per_day[time.strftime('%Y-%m-%d', time.localtime(entry['ts']))]
+            day['calls'] += 1
+            day['errors'] += 1 if entry.get('error') else 0
+            day['tokens'] += entry.get('total_tokens', 0)
+            day['cost'] += entry.get('cost', 0.0)
+            day['latency'] += entry.get('latency', 0.0)
+
+        history = []
+        for date in sorted(per_day):
+            day = per_day[date]
+            history.append({
+                "date": date,
+                "calls": day['calls'],
+                "errors": day['errors'],
+                "tokens": day['tokens'],
+                "cost": round(day['cost'], 4),
+                "avg_latency": round(day['latency'] / day['calls'], 2),
+            })
+        return history
+
+    @staticmethod
+    def _routes(entries):
+        routes = defaultdict(lambda: {"latencies": [], "errors": 0, "output_tokens": 0})
+        for entry in entries:
+            route = routes[(entry.get('call_type'), entry.get('model'))]
+            route['latencies'].append(entry.get('latency', 0.0))
+            route['errors'] += 1 if entry.get('error') else 0
+            route['output_tokens'] += entry.get('output_tokens', 0)
+
+        rows = []
+        for (call_type, model_name), route in routes.items():
+            calls = len(route['latencies'])
+            rows.append({
+                "call_type": call_type,
+                "model": model_name,
+                "calls": calls,
+                "errors": route['errors'],
+                "avg_output_tokens": route['output_tokens'] // calls,
+                "avg_latency": round(sum(route['latencies']) / calls, 2),
+                "p95_latency": _p95(route['latencies']),
+            })
+        return sorted(rows, key=lambda r: r['p95_latency'], reverse=True)
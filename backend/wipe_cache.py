@@ -17,15 +17,31 @@ def wipe_cache():
                     shutil.rmtree(file_path)
             except Exception as e:
                 print(f"   ❌ Failed {filename}: {e}")
-                
-        # Re-create empty topics.json
-        with open(os.path.join(lessons_dir, 'topics.json'), 'w') as f:
-            f.write("{}")
-        print("   ✅ Created fresh topics.json")
+
+        # topics.log (the topic history) went with the rest; LessonManager starts a new one on the next save
+        print("   ✅ Topic history cleared")
     else:
         print("   Directory not found (Nothing to wipe).")
-        
+
+    wipe_remote_cache()
     print("✨ Cache Cleaned.")
 
+def wipe_remote_cache():
+    # The remote tier ('remote_cache' config) would otherwise refill lessons/ on the next read
+    try:
+        from backend import data_manager
+        from backend.remote_cache import get_remote_cache
+        remote = get_remote_cache(data_manager.get_config())
+    except Exception as e:
+        print(f"   ⚠️ Could not load the remote cache config: {e}")
+        return
+    if remote is None:
+        return
+    count = remote.clear()
+    if count is None:
+        print(f"   ❌ Remote cache ({remote.name}) not cleared; see the log.")
+    else:
+        print(f"   ✅ Remote cache ({remote.name}) cleared: {count} rows")
+
 if __name__ == "__main__":
     wipe_cache()
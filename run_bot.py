@@ -3,6 +3,7 @@ import os
 import argparse
 import logging
 import time
+import asyncio
 
 print("--- STARTUP DIAGNOSTICS ---")
 print(f"CWD: {os.getcwd()}")
@@ -13,7 +14,8 @@ print("---------------------------")
 
 try:
     from collections import defaultdict
-    from backend import data_manager, gemini_service, email_service, lesson_manager
+    from backend import data_manager, gemini_service, email_service, lesson_manager, outbox, async_mailer, generation_pool, quiz_analysis
+    from backend.gemini_service import GenerationError
 except ImportError as e:
     print(f"!!! CRITICAL IMPORT ERROR !!!: {e}")
     print("Files in current dir:", os.listdir('.'))
@@ -43,11 +45,11 @@ def run_motivation_cycle(gemini, mailer, cache):
     today_str = datetime.date.today().isoformat()
     
     # 1. Get/Generate
-    content = cache.get_motivation(today_str)
-    if not content:
-        logging.info("Cache Miss: Generating Motivation...")
-        content = gemini.generate_motivation()
-        cache.save_motivation(today_str, content)
+    try:
+        content = cache.get_or_create(today_str, gemini.generate_motivation, type="motivation")
+    except GenerationError as e:
+        logging.error(f"❌ Could not generate motivation ({e.kind}): {e}")
+        return
     
     # 2. Target Audience: Everyone Active (Pending or Sent)
     contacts = data_manager.get_contacts()
@@ -58,14 +60,14 @@ def run_motivation_cycle(gemini, mailer, cache):
         return
 
     logging.info(f"Sending motivation to {len(active_students)} students...")
-    success, msg = mailer.send_email(active_students, "⚡ PyDaily: Mid-Day Boost", content)
+    success, msg = mailer.send_email(active_students, "⚡ PyDaily: Mid-Day Boost", content, broadcast=True)
     
     if success:
         logging.info("✅ Motivation sent successfully.")
     else:
         logging.error(f"❌ Failed to send motivation: {msg}")
 
-def run_morning_cycle(gemini, mailer, cache):
+async def run_morning_cycle(pool, sender, mail_outbox):
     logging.info("🌞 Starting Morning Cycle (Lessons)...")
     contacts = data_manager.get_contacts()
     # Logic: Status 'pending' means they need the day's content
@@ -77,41 +79,41 @@ def run_morning_cycle(gemini, mailer, cache):
 
     day_groups = group_contacts_by_day(pending_contacts)
 
-    for day, group in day_groups.items():
-        logging.info(f"Processing Day {day} for {len(group)} students...")
-
-        # 1. Get/Generate Content
-        content = cache.get_lesson(day)
-        
-        # Check Quiz Logic
-        is_quiz_day = (int(day) % 3 == 0) and (int(day) > 0)
-        
-        if not content:
-            if is_quiz_day:
-                logging.info(f"🎯 Quiz Day detected: Generating Quiz for Day {day}...")
-                history = cache.get_topics_history(day)
-                content = gemini.generate_quiz(day, history)
-            else:
-                logging.info(f"Cache Miss: Generating Day {day} Lesson...")
-                # Get history up to yesterday
-                history = cache.get_topics_history(day - 1)
-                content = gemini.generate_lesson(day, history)
-            
-            cache.save_lesson(day, content)
-        
-        # 2. Send
-        subject = f"🎯 PyDaily Challenge: Day {day}" if is_quiz_day else f"🐍 PyDaily: Day {day}"
-        success, msg = mailer.send_email(group, subject, content)
+    async def deliver_group(day, group, subject, content):
+        message_id = mail_outbox.enqueue(group, subject, content)
+        delivered = set(await mail_outbox.deliver_async(message_id, sender))
         
-        if success:
-            # 3. Update Status
-            for student in group:
-                data_manager.update_contact_status(student['email'], status='lesson_sent')
-            logging.info(f"✅ Sent Day {day} to {len(group)} students.")
-        else:
-            logging.error(f"❌ Failed Day {day}: {msg}")
+        # 3. Update Status (only for students who actually got it)
+        for student in group:
+            if student['email'] in delivered:
+                await asyncio.to_thread(data_manager.update_contact_status, student['email'], status='lesson_sent')
+        logging.info(f"✅ Sent Day {day} to {len(delivered)}/{len(group)} students.")
+        if len(delivered) < len(group):
+            logging.error(f"❌ Day {day} undelivered: {mail_outbox.counts(message_id)} (message {message_id})")
+
+    # 1. Get/Generate Content for every day concurrently; each group's send starts as soon as its content is ready
+    requests = [generation_pool.morning_request(day) for day in day_groups]
+    async with sender:
+        sends = []
+        async for request, content, error in pool.agenerate(requests):
+            day = request['day']
+            group = day_groups[day]
+            if error is not None:
+                # Failures skip the group without caching anything
+                kind = getattr(error, 'kind', 'fatal')
+                logging.error(f"❌ Skipping Day {day}: generation failed ({kind}): {error}")
+                continue
+            logging.info(f"Processing Day {day} for {len(group)} students...")
+
+            # 2. Send (quiz days are cached as JSON; email the rendered version)
+            if request['type'] == 'quiz':
+                content = email_service.EmailService.format_quiz_for_email(content)
+            subject = f"🎯 PyDaily Challenge: Day {day}" if request['type'] == 'quiz' else f"🐍 PyDaily: Day {day}"
+            sends.append(asyncio.create_task(deliver_group(day, group, subject, content)))
 
-def run_evening_cycle(gemini, mailer, cache):
+        await asyncio.gather(*sends)
+
+async def run_evening_cycle(pool, sender, mail_outbox):
     logging.info("🌙 Starting Evening Cycle (Reminders)...")
     contacts = data_manager.get_contacts()
     sent_contacts = [c for c in contacts if c.get('status') == 'lesson_sent']
@@ -122,27 +124,70 @@ def run_evening_cycle(gemini, mailer, cache):
 
     day_groups = group_contacts_by_day(sent_contacts)
 
-    for day, group in day_groups.items():
-        logging.info(f"Processing Day {day} Reminders for {len(group)} students...")
+    async def deliver_group(day, group, content):
+        message_id = mail_outbox.enqueue(group, f"🌙 PyDaily Check-in: Day {day}", content)
+        delivered = set(await mail_outbox.deliver_async(message_id, sender, broadcast=True))
 
-        # 1. Get/Generate Content
-        content = cache.get_reminder(day)
-        if not content:
-            logging.info(f"Cache Miss: Generating Day {day} Reminder...")
-            content = gemini.generate_reminder(day)
-            cache.save_reminder(day, content)
-        
-        # 2. Send
-        success, msg = mailer.send_email(group, f"🌙 PyDaily Check-in: Day {day}", content)
-        if success:
-            # 3. Update Status (Complete + Increment Day)
-            for student in group:
-                data_manager.update_contact_status(student['email'], day=day+1, status='pending')
-            logging.info(f"✅ Sent Day {day} Reminders. Students promoted to Day {day+1}.")
-        else:
-            logging.error(f"❌ Failed Day {day} Reminders: {msg}")
+        # 3. Update Status (Complete + Increment Day) for delivered students only
+        for student in group:
+            if student['email'] in delivered:
+                await asyncio.to_thread(data_manager.update_contact_status, student['email'], day=day+1, status='pending')
+        logging.info(f"✅ Sent Day {day} Reminders. {len(delivered)}/{len(group)} students promoted to Day {day+1}.")
+        if len(delivered) < len(group):
+            logging.error(f"❌ Day {day} Reminders undelivered: {mail_outbox.counts(message_id)} (message {message_id})")
+
+    # 1. Get/Generate Content concurrently, sending each day as soon as it is ready
+    requests = [{'type': 'reminder', 'day': day} for day in day_groups]
+    async with sender:
+        sends = []
+        async for request, content, error in pool.agenerate(requests):
+            day = request['day']
+            group = day_groups[day]
+            if error is not None:
+                kind = getattr(error, 'kind', 'fatal')
+                logging.error(f"❌ Skipping Day {day} Reminders: generation failed ({kind}): {error}")
+                continue
+            logging.info(f"Processing Day {day} Reminders for {len(group)} students...")
+
+            # 2. Send
+            sends.append(asyncio.create_task(deliver_group(day, group, content)))
+
+        await asyncio.gather(*sends)
+
+def feedback_html(day, message):
+    return f"""
+                <div style="font-family:sans-serif; padding:15px; border-left:4px solid #4F46E5; background:#f9fafb;">
+                    <h3>💡 Quick Tip: Day {day}</h3>
+                    <p>{message}</p>
+                    <hr>
+                    <p style="font-size:12px; color:#666;">This tip was generated by your AI Tutor based on your recent quiz performance.</p>
+                </div>
+                """
+
+def send_cluster_feedback(gemini, mailer, day, topic, results, key, names):
+    """
+    Groups results by wrong-answer pattern and sends one generated tip per cluster.
+    Returns the quiz result ids whose email was delivered.
+    """
+    sent_ids = []
+    for cluster in quiz_analysis.cluster_results(results, key):
+        members = cluster['results']
+        try:
+            tip = gemini.generate_cluster_tip(topic, cluster['questions'], len(members))
+        except GenerationError as e:
+            logging.error(f"❌ Skipping cluster of {len(members)} (Day {day}) ({e.kind}): {e}")
+            continue
+
+        recipients = [{'email': r['email'], 'name': names.get(r['email'], 'there')} for r in members]
+        try:
+            delivery = mailer.send_batch(recipients, tip['subject'], feedback_html(day, tip['message']))
+        except Exception as e:
+            logging.error(f"❌ Cluster send failed (Day {day}): {e}")
+            continue
+        sent_ids += [r['id'] for r in members if delivery.get(r['email'], (None,))[0] == email_service.DELIVERY_SENT]
+    return sent_ids
 
-def run_insights_cycle(gemini, mailer, cache):
+def run_insights_cycle(gemini, mailer, cache, mode="cluster"):
     logging.info("🧐 Starting Insights Cycle (AI Feedback)...")
     
     # 1. Fetch Pending Results
@@ -208,8 +253,26 @@ def run_insights_cycle(gemini, mailer, cache):
         if not valid_results:
             continue
             
+        # Score everyone against the cached quiz's answer key in one pass
+        key = quiz_analysis.answer_key(cache, day)
+        question_summary = quiz_analysis.enrich_results(valid_results, key) if key else ""
+
+        # Preferred: one tip per wrong-answer pattern, personalized with the student's name at send time
+        if key and mode == 'cluster':
+            names = {s['email']: s.get('name') or 'there' for s in all_students}
+            sent_ids = send_cluster_feedback(gemini, mailer, day, topic, valid_results, key, names)
+            if sent_ids:
+                data_manager.db.admin_mark_feedback_sent(sent_ids)
+                logging.info(f"✅ Feedback sent and tracked for {len(sent_ids)} students.")
+            continue
+
+        # Per-student tips (insights_mode: student, or no parseable quiz cached)
         # Call Gemini
-        raw_json = gemini.generate_class_insights(valid_results, topic)
+        try:
+            raw_json = gemini.generate_class_insights(valid_results, topic, question_summary)
+        except GenerationError as e:
+            logging.error(f"❌ Skipping Day {day} insights ({e.kind}): {e}")
+            continue
         
         import json
         try:
@@ -223,14 +286,7 @@ def run_insights_cycle(gemini, mailer, cache):
                 if not email: continue
                 
                 # Send Email
-                html_body = f"""
-                <div style="font-family:sans-serif; padding:15px; border-left:4px solid #4F46E5; background:#f9fafb;">
-                    <h3>💡 Quick Tip: Day {day}</h3>
-                    <p>{item['message']}</p>
-                    <hr>
-                    <p style="font-size:12px; color:#666;">This tip was generated by your AI Tutor based on your recent quiz performance.</p>
-                </div>
-                """
+                html_body = feedback_html(day, item['message'])
                 
                 success, msg = mailer.send_email([{'email': email}], item['subject'], html_body)
                 
@@ -275,28 +331,37 @@ def main():
     print("Full Env Keys:", sorted(masked_env.keys()))
     print("-----------------")
 
-    if not config.get('gemini_key') or not config.get('email_address') or not config.get('supabase_url'):
+    # Offline transports (file capture / sink) don't need mail credentials, nor does the fake Gemini backend a key
+    needs_email = config.get('mail_transport', 'smtp') == 'smtp'
+    needs_key = config.get('gemini_backend', 'api') != 'fake'
+    if (needs_key and not config.get('gemini_key')) or (needs_email and not config.get('email_address')) or not config.get('supabase_url'):
         logging.error("Configuration missing! Checking: Gemini, Email, Supabase URL.")
         sys.exit(1)
 
     # Init Services
-    gemini = gemini_service.GeminiService(config['gemini_key'])
-    mailer = email_service.EmailService(
-        config['email_address'], 
-        config['email_password'],
-        test_mode=config.get('test_mode', False),
-        admin_email=config.get('admin_email', '')
-    )
-    cache = lesson_manager.LessonManager()
+    gemini = gemini_service.GeminiService.from_config(config)
+    mailer = email_service.EmailService.from_config(config)
+    cache = lesson_manager.LessonManager.from_config(config)
+    mail_outbox = outbox.Outbox.from_config(config)
+    sender = async_mailer.AsyncMailer.from_config(mailer, config)
+    pool = generation_pool.GenerationPool.from_config(gemini, cache, config)
 
     if args.mode == 'morning':
-        run_morning_cycle(gemini, mailer, cache)
+        asyncio.run(run_morning_cycle(pool, sender, mail_outbox))
     elif args.mode == 'evening':
-        run_evening_cycle(gemini, mailer, cache)
+        asyncio.run(run_evening_cycle(pool, sender, mail_outbox))
     elif args.mode == 'motivation':
         run_motivation_cycle(gemini, mailer, cache)
     elif args.mode == 'insights':
-        run_insights_cycle(gemini, mailer, cache)
+        run_insights_cycle(gemini, mailer, cache, mode=config.get('insights_mode', 'cluster'))
+
+    # LLM spend for this run (also appended per call to gemini_usage.jsonl)
+    logging.info(gemini.usage.summary())
+    logging.info(gemini.response_cache.summary())
+    logging.info(cache.content_cache.summary())
+    if cache.remote is not None:
+        logging.info(cache.remote.summary())
+    print(gemini.usage.summary())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,19 @@
+-- Durable content cache for the bot (config 'remote_cache': 'supabase' / env REMOTE_CACHE=supabase)
+-- One row per generated item: lessons/quizzes and reminders keyed by day, motivations by date.
+create table public.content_cache (
+  type text not null,          -- 'lesson' | 'reminder' | 'motivation'
+  key text not null,           -- day number, or YYYY-MM-DD for motivations
+  day int,                     -- null for motivations
+  content text not null,       -- minified HTML (quiz days: JSON)
+  topic text,                  -- <!-- TOPIC: ... --> of lessons
+  model text,
+  hash text,                   -- sha256 of content
+  size int,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  primary key (type, key)
+);
+
+create index content_cache_day_idx on public.content_cache (type, day);
+
+-- RLS on with no policies: only the Service Role Key (the bot) can read/write.
+alter table public.content_cache enable row level security;
@@ -0,0 +1,35 @@
+import asyncio
+
+from backend.async_mailer import AsyncMailer
+from backend.email_service import EmailService, DELIVERY_SENT, DELIVERY_FAILED
+from backend.mail_transport import SinkTransport
+from backend.rate_limiter import RateLimiter
+
+
+class CountingSink(SinkTransport):
+    def __init__(self):
+        super().__init__()
+        self.opened = 0
+
+    def open(self):
+        self.opened += 1
+        return super().open()
+
+
+def test_quota_defers_the_rest_without_reconnecting(tmp_path):
+    transport = CountingSink()
+    limiter = RateLimiter(per_second=0, per_minute=0, per_day=2, usage_file=str(tmp_path / "usage.json"))
+    mailer = EmailService("bot@pydaily.dev", "", rate_limiter=limiter, transport=transport)
+    group = [{'email': f"s{i}@example.com", 'name': f"S{i}"} for i in range(20)]
+
+    async def run():
+        async with AsyncMailer(mailer, connections=3) as sender:
+            return await sender.send_batch(group, "Day 1", "<p>Hi {{NAME}}</p>")
+
+    results = asyncio.run(run())
+
+    states = [state for state, _ in results.values()]
+    assert states.count(DELIVERY_SENT) == 2
+    assert states.count(DELIVERY_FAILED) == 18
+    assert all(detail == "deferred (daily limit)" for state, detail in results.values() if state == DELIVERY_FAILED)
+    assert transport.opened <= 3  # one connection per worker at most, no reconnect per deferred job
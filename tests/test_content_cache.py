@@ -0,0 +1,56 @@
+import os
+
+from backend.content_cache import ContentCache
+
+
+def write(path, text, mtime_ns=None):
+    path.write_text(text, encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_repeated_reads_are_hits(tmp_path):
+    cache = ContentCache()
+    lesson = tmp_path / "day_1_lesson.html"
+    write(lesson, "<p>Día 1</p>")
+
+    assert cache.read(lesson) == "<p>Día 1</p>"
+    assert cache.read(str(lesson)) == "<p>Día 1</p>"
+    assert (cache.stats['hits'], cache.stats['misses']) == (1, 1)
+    assert cache.read(tmp_path / "missing.html") is None
+
+
+def test_changed_file_is_reread(tmp_path):
+    cache = ContentCache()
+    lesson = tmp_path / "day_1_lesson.html"
+    write(lesson, "<p>old</p>", mtime_ns=1_000_000_000)
+    cache.read(lesson)
+
+    write(lesson, "<p>new content</p>", mtime_ns=2_000_000_000)
+    assert cache.read(lesson) == "<p>new content</p>"
+    assert cache.stats['stale'] == 1
+
+    lesson.unlink()
+    assert cache.read(lesson) is None
+    assert cache.entries == {} and cache.total_bytes == 0
+
+
+def test_lru_eviction_keeps_within_max_bytes(tmp_path):
+    cache = ContentCache(max_bytes=25)
+    paths = []
+    for day in range(3):
+        path = tmp_path / f"day_{day}.html"
+        write(path, "x" * 10)
+        paths.append(path)
+
+    cache.read(paths[0])
+    cache.read(paths[1])
+    cache.read(paths[0])  # day 0 is now more recent than day 1
+    cache.read(paths[2])
+
+    assert cache.total_bytes == 20 and cache.stats['evictions'] == 1
+    assert list(cache.entries) == [str(paths[0]), str(paths[2])]
+
+    write(tmp_path / "huge.html", "y" * 100)
+    assert cache.read(tmp_path / "huge.html") == "y" * 100  # served, but too big to keep
+    assert cache.total_bytes == 20
@@ -0,0 +1,61 @@
+import sqlite3
+
+from backend.content_store import COMPRESS_MIN_BYTES, SQLiteContentStore, get_store, migrate
+from backend.lesson_manager import LessonManager
+from backend.content_cache import ContentCache
+
+
+def test_round_trip_with_and_without_compression(tmp_path):
+    store = SQLiteContentStore(str(tmp_path / "content.db"))
+    big = "<p>Día 3 – listas</p>" * (COMPRESS_MIN_BYTES // 10)
+    store.put("lesson", 3, big, model="gemini-flash-latest", topic="Lists")
+    store.put("motivation", "2026-10-19", "<p>Keep going</p>")
+
+    assert store.get("lesson", 3) == big
+    assert store.get("motivation", "2026-10-19") == "<p>Keep going</p>"
+    assert store.get("reminder", 3) is None
+
+    rows = {(r['type'], r['key']): r for r in store.entries()}
+    assert rows[("lesson", "3")]['compressed'] == 1 and rows[("lesson", "3")]['size'] == len(big.encode())
+    assert rows[("motivation", "2026-10-19")]['compressed'] == 0
+    assert rows[("motivation", "2026-10-19")]['date'] == "2026-10-19"
+
+
+def test_topic_history_interface(tmp_path):
+    store = SQLiteContentStore(str(tmp_path / "content.db"))
+    store.set(1, "Variables")
+    store.put("lesson", 2, "<p>x</p>", topic="Strings")
+    store.set(3, "Loops")
+    store.put("lesson", 3, "<p>y</p>")  # saving the body keeps the topic already set
+
+    assert store.upto(2) == {1: "Variables", 2: "Strings"}
+    assert store.upto(10)[3] == "Loops"
+    assert [r['day'] for r in store.entries(type="lesson")] == [2, 3]  # topic-only rows have no content
+
+
+def test_migrate_imports_the_lessons_directory(tmp_path):
+    lessons = tmp_path / "lessons"
+    lessons.mkdir()
+    (lessons / "day_1_lesson.html").write_text("<!-- TOPIC: Variables --><p>1</p>", encoding="utf-8")
+    (lessons / "day_1_reminder.html").write_text("<p>r</p>", encoding="utf-8")
+    (lessons / "motivation_2026-10-19.html").write_text("<p>m</p>", encoding="utf-8")
+    (lessons / "topics.log").write_text('{"day": 1, "topic": "Variables"}\n', encoding="utf-8")
+    (lessons / "notes.txt").write_text("ignored", encoding="utf-8")
+
+    store = SQLiteContentStore(str(tmp_path / "content.db"))
+    assert migrate(str(lessons), store) == {"lesson": 1, "reminder": 1, "motivation": 1, "topics": 1}
+    assert migrate(str(lessons), store)["lesson"] == 1  # re-runnable
+    assert store.get("reminder", 1) == "<p>r</p>" and store.upto(1) == {1: "Variables"}
+
+
+def test_lesson_manager_on_the_sqlite_store(tmp_path):
+    lessons = str(tmp_path / "lessons")
+    store = get_store({'content_store': 'sqlite'}, lessons)
+    cache = LessonManager(lessons, content_cache=ContentCache(), store=store)
+    cache.save_lesson(4, "<!-- TOPIC: Dicts --><h1>Day 4</h1>")
+
+    assert "Day 4" in cache.get_lesson(4)
+    assert cache.topics.upto(4) == {4: "Dicts"}
+    with sqlite3.connect(store.path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert get_store({}, lessons) is None
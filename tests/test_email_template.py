@@ -0,0 +1,33 @@
+import email
+from email import policy
+
+from backend.email_template import CompiledTemplate
+
+HTML = "<p>Hi {{NAME}},</p>" + "<p>" + "Lists, dicts and sets = café ☕ " * 20 + "</p><p>Bye {{NAME}}</p>"
+
+
+def parse(raw):
+    return email.message_from_bytes(raw, policy=policy.default)
+
+
+def test_personalized_body_round_trips():
+    template = CompiledTemplate(HTML)
+    msg = parse(template.build("bot@pydaily.dev", "zoe@example.com", "🐍 Day 3: Sets", name="Zoë"))
+
+    assert msg.get_content().replace("\r\n", "\n") == HTML.replace("{{NAME}}", "Zoë")
+    assert msg['Subject'] == "🐍 Day 3: Sets"
+    assert msg['To'] == "zoe@example.com"
+    assert msg['Date'] and msg['Message-ID'].endswith("@pydaily.dev>")
+
+
+def test_lines_respect_the_smtp_limit():
+    raw = CompiledTemplate(HTML).build("bot@pydaily.dev", "a@example.com", "Day 1", name="A" * 200)
+    assert all(len(line) <= 76 for line in raw.split(b"\r\n\r\n", 1)[1].split(b"\r\n"))
+
+
+def test_each_message_gets_its_own_id():
+    template = CompiledTemplate("<p>no placeholder</p>")
+    first = parse(template.build("bot@pydaily.dev", "a@example.com", "Day 1"))
+    second = parse(template.build("bot@pydaily.dev", "b@example.com", "Day 1"))
+    assert first['Message-ID'] != second['Message-ID']
+    assert first.get_content().strip() == "<p>no placeholder</p>"
@@ -0,0 +1,44 @@
+import json
+
+from backend.fake_gemini import FakeGeminiBackend
+from backend.structured_output import INSIGHTS_SCHEMA, QUIZ_SCHEMA, generation_config
+
+HISTORY = "Day 1: Variables\nDay 2: Strings"
+
+
+def ask(prompt, schema=None):
+    backend = FakeGeminiBackend()
+    return backend.model("fake-gemini-flash-latest").generate_content(
+        prompt, generation_config=generation_config(schema) if schema else None).text
+
+
+def test_quiz_day_comes_from_the_title_line_not_the_history():
+    prompt = f"""
+            The student has completed Days 1-3.
+            Topics Covered So Far: {HISTORY}
+            JSON SCHEMA:
+            {{
+                "title": "Day 3 Checkpoint",
+            }}"""
+    assert json.loads(ask(prompt, QUIZ_SCHEMA))['title'] == "Day 3 Checkpoint"
+
+
+def test_lesson_day_comes_from_the_request_line():
+    prompt = f"""
+        CONTEXT (Topics covered so far):
+        {HISTORY}
+            Generate the official PyDaily Newsletter for Day 3.
+            TODAY'S TOPIC: Lists"""
+    assert "PyDaily &bull; Day 3</div><h1>Lists</h1>" in ask(prompt)
+
+
+def test_insights_echo_every_student_from_the_json_payload():
+    rows = [{"email": "o'brien@x.com", "score": "3/10"}, {"email": "zoë@y.org", "score": "9/10"}]
+    prompt = f"""
+            DATA (per student; "wrong" lists the question ids they missed):
+            {json.dumps(rows, ensure_ascii=False)}
+
+            OUTPUT SCHEMA (JSON):
+            {{"student_feedback": [{{"email": "student@example.com"}}]}}"""
+    feedback = json.loads(ask(prompt, INSIGHTS_SCHEMA))['student_feedback']
+    assert [f['email'] for f in feedback] == ["o'brien@x.com", "zoë@y.org"]
@@ -0,0 +1,42 @@
+from backend.html_minifier import minify_html, strip_fences
+from backend.lesson_manager import LessonManager
+
+CARD = 'style="background:#f8fafc; border:1px solid #e2e8f0;  padding:16px; border-radius:8px"'
+HTML = f"""```html
+<!-- TOPIC: Loops -->
+<!-- generated -->
+<div {CARD}>
+    <p>One   two</p>
+</div>
+<div {CARD}><p>a</p></div>
+<div {CARD}><p>b</p></div>
+<pre><code>for i in range(3):
+    print(i)</code></pre>
+```"""
+
+
+def test_minify_keeps_topic_tag_and_code_blocks():
+    content, stats = minify_html(HTML)
+    assert content.startswith("<!-- TOPIC: Loops -->")
+    assert "generated" not in content and "```" not in content
+    assert "<p>One two</p>" in content
+    assert "for i in range(3):\n    print(i)" in content
+    assert stats['after'] < stats['before'] and stats['saved_pct'] > 0
+
+
+def test_dedupe_styles_hoists_repeated_inline_styles():
+    content, _ = minify_html(HTML, dedupe_styles=True)
+    assert content.startswith("<style>.pd0{background:#f8fafc;border:1px solid #e2e8f0;padding:16px;border-radius:8px}</style>")
+    assert content.count('class="pd0"') == 3 and "style=" not in content.split("</style>", 1)[1]
+
+
+def test_non_html_only_loses_fences():
+    assert strip_fences('```json\n{"a": 1}\n```') == '{"a": 1}'
+    assert minify_html('```json\n{"a":  1}\n```')[0] == '{"a":  1}'
+
+
+def test_from_config_passes_minify_options(tmp_path):
+    cache = LessonManager.from_config(
+        {'minify_dedupe_styles': True, 'generation_lock_timeout': 5}, lessons_dir=str(tmp_path / "lessons"))
+    assert cache.minify and cache.dedupe_styles
+    assert cache.single_flight.timeout == 5
@@ -0,0 +1,46 @@
+import threading
+import time
+
+from backend.content_cache import ContentCache
+from backend.lesson_manager import LessonManager
+
+LESSON = "<!-- TOPIC: Loops --><h1>Day 3</h1><p>for x in range(3): print(x)</p>"
+
+
+def make_cache(tmp_path):
+    return LessonManager(str(tmp_path / "lessons"), content_cache=ContentCache())
+
+
+def test_concurrent_get_or_create_generates_once(tmp_path):
+    cache = make_cache(tmp_path)
+    calls = []
+    start = threading.Barrier(8)
+    results = []
+
+    def generate():
+        calls.append(1)
+        time.sleep(0.2)  # keep the lock held while the others arrive
+        return LESSON
+
+    def worker():
+        start.wait()
+        results.append(cache.get_or_create(3, generate))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8
+    assert len(set(results)) == 1 and "Day 3" in results[0]
+
+
+def test_generation_locks_are_dropped_after_release(tmp_path):
+    cache = make_cache(tmp_path)
+    for day in range(1, 6):
+        cache.get_or_create(day, lambda: LESSON)
+    with cache.generation_lock(9):
+        assert list(cache.single_flight._locks) == ["lesson_9"]
+    assert cache.single_flight._locks == {}
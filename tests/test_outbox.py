@@ -0,0 +1,105 @@
+import time
+
+from backend.outbox import Outbox, SENT, FAILED, RETRYING
+
+RECIPIENTS = [{'email': 'a@example.com', 'name': 'A'}, {'email': 'b@example.com', 'name': 'B'}]
+
+
+class FakeMailer:
+    """Replays a scripted state per attempt for each address; the last one repeats."""
+
+    def __init__(self, script):
+        self.script = script
+        self.calls = []
+
+    def send_batch(self, recipients, subject, html, broadcast=False):
+        self.calls.append([r['email'] for r in recipients])
+        results = {}
+        for r in recipients:
+            states = self.script[r['email']]
+            attempt = sum(r['email'] in call for call in self.calls) - 1
+            results[r['email']] = (states[min(attempt, len(states) - 1)], "scripted")
+        return results
+
+
+def make_outbox(tmp_path, max_attempts=3):
+    return Outbox(str(tmp_path / "outbox.db"), max_attempts=max_attempts, base_delay=0.01, max_delay=0.05)
+
+
+def test_retrying_recipient_is_sent_on_a_later_attempt(tmp_path):
+    outbox = make_outbox(tmp_path)
+    message_id = outbox.enqueue(RECIPIENTS, "Day 1", "<p>hi</p>")
+    mailer = FakeMailer({'a@example.com': [SENT], 'b@example.com': [RETRYING, SENT]})
+
+    sent = outbox.deliver(message_id, mailer, max_wait=5)
+
+    assert sorted(sent) == ['a@example.com', 'b@example.com']
+    assert mailer.calls == [['a@example.com', 'b@example.com'], ['b@example.com']]
+    status = outbox.status(message_id)
+    assert status['a@example.com'][:2] == (SENT, 1)
+    assert status['b@example.com'][:2] == (SENT, 2)
+
+
+def test_permanent_failure_is_not_retried(tmp_path):
+    outbox = make_outbox(tmp_path)
+    message_id = outbox.enqueue(RECIPIENTS, "Day 1", "<p>hi</p>")
+    mailer = FakeMailer({'a@example.com': [SENT], 'b@example.com': [FAILED]})
+
+    assert outbox.deliver(message_id, mailer, max_wait=5) == ['a@example.com']
+    assert len(mailer.calls) == 1
+    assert outbox.status(message_id)['b@example.com'][:2] == (FAILED, 1)
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    outbox = make_outbox(tmp_path, max_attempts=3)
+    message_id = outbox.enqueue(RECIPIENTS[:1], "Day 1", "<p>hi</p>")
+    mailer = FakeMailer({'a@example.com': [RETRYING]})
+
+    assert outbox.deliver(message_id, mailer, max_wait=5) == []
+    state, attempts, error = outbox.status(message_id)['a@example.com']
+    assert (state, attempts) == (FAILED, 3)
+    assert error.startswith("Gave up after 3 attempts")
+
+
+def test_unexpired_retries_join_the_next_send(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"), max_attempts=3, base_delay=60, max_delay=60)
+    message_id = outbox.enqueue(RECIPIENTS, "Day 1", "<p>hi</p>")
+    outbox.deliver(message_id, FakeMailer({'a@example.com': [SENT], 'b@example.com': [RETRYING]}),
+                   max_wait=0, expire=False)
+    assert outbox.status(message_id)['b@example.com'][0] == RETRYING
+
+    assert outbox.enqueue(RECIPIENTS, "Day 1", "<p>hi</p>") == message_id
+
+
+def test_reenqueued_sent_recipient_is_sent_again(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"), max_attempts=3, base_delay=60, max_delay=60)
+    message_id = outbox.enqueue(RECIPIENTS, "Day 1", "<p>hi</p>")
+    outbox.deliver(message_id, FakeMailer({'a@example.com': [SENT], 'b@example.com': [RETRYING]}),
+                   max_wait=0, expire=False)
+
+    # e.g. after reset_cohort: a needs the same lesson again while b is still retrying
+    assert outbox.enqueue(RECIPIENTS[:1], "Day 1", "<p>hi</p>") == message_id
+    mailer = FakeMailer({'a@example.com': [SENT]})
+    assert outbox.deliver(message_id, mailer, max_wait=0, expire=False) == ['a@example.com']
+    assert mailer.calls == [['a@example.com']]
+
+
+def test_deliver_returns_only_this_calls_recipients(tmp_path):
+    outbox = make_outbox(tmp_path)
+    message_id = outbox.enqueue(RECIPIENTS[:1], "Day 1", "<p>hi</p>")
+    outbox.deliver(message_id, FakeMailer({'a@example.com': [SENT]}), max_wait=5)
+
+    assert outbox.deliver(message_id, FakeMailer({}), max_wait=5) == []
+    assert outbox.sent_recipients(message_id) == ['a@example.com']
+
+
+def test_stale_retries_are_expired_instead_of_reused(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"), max_attempts=3, base_delay=60, max_delay=60, reuse_window=0)
+    message_id = outbox.enqueue(RECIPIENTS, "Day 1", "<p>hi</p>")
+    outbox.deliver(message_id, FakeMailer({'a@example.com': [SENT], 'b@example.com': [RETRYING]}),
+                   max_wait=0, expire=False)
+    time.sleep(0.01)
+
+    assert outbox.enqueue(RECIPIENTS, "Day 1", "<p>hi</p>") != message_id
+    state, _, error = outbox.status(message_id)['b@example.com']
+    assert state == FAILED and error.startswith("Retry window elapsed")
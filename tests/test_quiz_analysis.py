@@ -0,0 +1,56 @@
+import json
+
+import pandas as pd
+
+from backend.quiz_analysis import cluster_results, enrich_results, score_results, wrong_pattern
+
+KEY = {
+    "1": {"id": 1, "question": "len([1, 2])?", "answer": "A) 2"},
+    "2": {"id": 2, "question": "type({})?", "answer": "B) dict"},
+    "3": {"id": 3, "question": "3 // 2?", "answer": "C) 1"},
+}
+
+
+RESULTS = [
+    {"email": "all@x.com", "answers_json": {"1": "A) 2", "2": "B) dict", "3": "C) 1"}},
+    {"email": "two@x.com", "answers_json": json.dumps({"1": "A) 2", "2": "A) set", "3": "C) 1"})},
+    {"email": "none@x.com", "answers_json": "not json at all"},
+    {"email": "int@x.com", "answers_json": {1: "A) 2", 2: "A) set"}},  # int ids, question 3 unanswered
+]
+
+
+def test_score_results_scores_each_student_in_order():
+    students, questions = score_results(RESULTS, KEY)
+
+    assert students['score'].tolist() == [3, 2, 0, 1]
+    assert students['total'].tolist() == [3, 3, 3, 3]
+    assert students['wrong'].tolist() == ["", "Q2", "Q1,Q2,Q3", "Q2,Q3"]
+    assert questions.loc["2", 'miss_rate'] == 0.75
+    assert questions.loc["2", 'top_wrong'] == "A) set"
+    assert pd.isna(questions.loc["1", 'top_wrong'])  # only missed by leaving it blank
+
+
+def test_score_results_matches_the_per_student_pattern():
+    students, _ = score_results(RESULTS, KEY)
+    for res, wrong in zip(RESULTS, students['wrong']):
+        assert ",".join(f"Q{qid}" for qid in wrong_pattern(res['answers_json'], KEY)) == wrong
+
+
+def test_empty_results():
+    students, questions = score_results([], KEY)
+    assert students.empty and questions.empty
+    assert enrich_results([], KEY) == ""
+
+
+def test_enrich_results_fills_scores_and_summarizes_misses():
+    results = [dict(r) for r in RESULTS]
+    summary = enrich_results(results, KEY)
+    assert [r['wrong_summary'] for r in results] == ["none", "Q2", "Q1,Q2,Q3", "Q2,Q3"]
+    assert summary.splitlines()[0].startswith("Q2 (75% missed, common wrong pick: A) set; correct: B) dict)")
+
+
+def test_cluster_results_groups_identical_mistakes():
+    results = RESULTS + [{"email": "two-again@x.com", "answers_json": {"2": "C) list", "1": "A) 2", "3": "C) 1"}}]
+    clusters = cluster_results(results, KEY)
+    assert clusters[0]['pattern'] == ("2",)
+    assert [r['email'] for r in clusters[0]['results']] == ["two@x.com", "two-again@x.com"]
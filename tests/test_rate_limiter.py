@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from backend.rate_limiter import RateLimiter, QuotaExceeded
+
+
+@pytest.mark.parametrize("code, message", [
+    (421, "Service not available, closing transmission channel"),
+    (454, "Temporary authentication failure"),
+    (550, "5.4.5 Daily user sending limit exceeded."),
+    (452, "4.7.0 Too many messages, try again later"),
+    (550, "5.7.1 Our system has detected that you are being rate limited"),
+    (554, b"Sending quota exceeded"),
+])
+def test_throttle_replies(code, message):
+    assert RateLimiter.is_throttle(code, message)
+
+
+@pytest.mark.parametrize("code, message", [
+    (550, "5.1.1 The email account that you tried to reach does not exist"),
+    (552, "5.2.2 Mailbox size limit exceeded"),
+    (553, "Generated message rejected: 15.4.59 policy"),
+    (250, "2.0.0 OK quota exceeded"),
+])
+def test_ordinary_replies_are_not_throttles(code, message):
+    assert not RateLimiter.is_throttle(code, message)
+
+
+def test_only_explicit_quota_replies_close_the_day():
+    assert RateLimiter.is_quota(550, "5.4.5 Daily user sending limit exceeded.")
+    assert RateLimiter.is_quota(554, "Daily sending quota exceeded")
+    assert not RateLimiter.is_quota(452, "4.7.0 Too many messages")
+    assert not RateLimiter.is_quota(421, "Try again later")
+
+
+def test_quota_reply_exhausts_shared_daily_count(tmp_path):
+    usage_file = str(tmp_path / "mail_usage.json")
+    limiter = RateLimiter(per_second=0, per_minute=0, per_day=10, usage_file=usage_file)
+    limiter.acquire()
+    assert RateLimiter(per_second=0, per_minute=0, per_day=10, usage_file=usage_file).remaining_today() == 9
+
+    limiter.on_throttle(550, "5.4.5 Daily user sending limit exceeded.")
+    assert limiter.remaining_today() == 0
+
+
+def test_concurrent_senders_never_exceed_the_daily_cap(tmp_path):
+    usage_file = str(tmp_path / "mail_usage.json")
+    limiters = [RateLimiter(per_second=0, per_minute=0, per_day=5, usage_file=usage_file) for _ in range(4)]
+    sent = []
+    start = threading.Barrier(len(limiters) * 3)
+
+    def sender(limiter):
+        start.wait()
+        for _ in range(5):
+            try:
+                limiter.acquire()
+            except QuotaExceeded:
+                return
+            sent.append(1)
+
+    threads = [threading.Thread(target=sender, args=(limiter,)) for limiter in limiters for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(sent) == 5
+    assert limiters[0].remaining_today() == 0
+    with pytest.raises(QuotaExceeded):
+        limiters[1].acquire()
@@ -0,0 +1,26 @@
+from backend.remote_cache import get_remote_cache
+
+
+def test_disabled_or_misconfigured_remote_falls_back_to_local(tmp_path):
+    assert get_remote_cache({}) is None
+    assert get_remote_cache({'remote_cache': 'supabase'}) is None
+    # A path that can't be created must not break LessonManager.from_config
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    assert get_remote_cache({'remote_cache': 'directory', 'remote_cache_dir': str(blocker / "sub")}) is None
+
+
+def test_directory_remote_round_trip(tmp_path):
+    remote = get_remote_cache({'remote_cache': 'directory', 'remote_cache_dir': str(tmp_path / "remote")})
+    remote.put("lesson", 4, "<!-- TOPIC: Sets --><p>x</p>")
+    assert remote.get("lesson", 4) == "<!-- TOPIC: Sets --><p>x</p>"
+    assert remote.get("lesson", 5) is None
+    assert remote.stats == {"hits": 1, "misses": 1, "writes": 1, "errors": 0}
+
+
+def test_clear_empties_the_remote(tmp_path):
+    remote = get_remote_cache({'remote_cache': 'directory', 'remote_cache_dir': str(tmp_path / "remote")})
+    remote.put("lesson", 1, "<p>a</p>")
+    remote.put("motivation", "2026-01-01", "<p>b</p>")
+    assert remote.clear() == 2
+    assert remote.get("lesson", 1) is None
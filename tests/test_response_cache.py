@@ -0,0 +1,31 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.response_cache import ResponseCache
+
+
+def _write(cache_dir, n):
+    cache = ResponseCache(cache_dir)
+    for i in range(50):
+        cache.put("shared", f"worker {n} answer {i} " * 50)
+    return n
+
+
+def test_concurrent_processes_never_leave_a_torn_entry(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    with ProcessPoolExecutor(4) as pool:
+        list(pool.map(_write, [cache_dir] * 4, range(4)))
+
+    text = ResponseCache(cache_dir).get("shared")
+    unit = text[:len(text) // 50]
+    assert unit.startswith("worker ") and text == unit * 50  # one writer's whole entry, not a mix
+    assert os.listdir(cache_dir) == ["shared.json"]
+
+
+def test_round_trip_and_ttl(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"))
+    key = ResponseCache.make_key("gemini-2.5-flash", "system", "prompt")
+    cache.put(key, "hello", model_name="gemini-2.5-flash")
+    assert cache.get(key) == "hello"
+    assert cache.get(key, ttl=-1) is None
+    assert cache.stats['hits'] == 1 and cache.stats['expired'] == 1
@@ -0,0 +1,36 @@
+import pytest
+
+from backend.structured_output import QUIZ_SCHEMA, StructuredOutputError, repair_json, validate
+
+
+@pytest.mark.parametrize("text", [
+    '{"title": "Day 2", "questions": []}',
+    '```json\n{"title": "Day 2", "questions": []}\n```',
+    'Here is your quiz:\n{"title": "Day 2", "questions": [],}\nGood luck!',
+    "{'title': 'Day 2', 'questions': []}",
+    '{“title”: “Day 2”, "questions": []}',
+])
+def test_near_json_is_repaired(text):
+    assert repair_json(text) == {"title": "Day 2", "questions": []}
+
+
+def test_truncated_output_is_closed():
+    data = repair_json('{"title": "Day 2", "questions": [{"id": 1, "question": "What is a lis')
+    assert data == {"title": "Day 2", "questions": [{"id": 1, "question": "What is a lis"}]}
+
+
+def test_valid_json_of_another_shape_is_returned_as_is():
+    # Callers must check the shape themselves (the student quiz view falls back to legacy)
+    assert repair_json('[1, 2, 3]') == [1, 2, 3]
+
+
+def test_unrepairable_output_raises_a_value_error():
+    with pytest.raises(StructuredOutputError) as err:
+        repair_json("Sorry, I can't help with that.")
+    assert isinstance(err.value, ValueError)
+
+
+def test_validate_reports_schema_violations():
+    errors = validate({"title": "Day 2", "questions": [{"id": "1", "question": "Q?"}]}, QUIZ_SCHEMA)
+    assert "$.questions[0].id: expected integer, got str" in errors
+    assert "$.questions[0]: missing 'answer'" in errors
@@ -0,0 +1,69 @@
+import json
+import os
+import threading
+
+from backend.topic_log import TopicLog
+
+
+def test_set_and_upto(tmp_path):
+    log = TopicLog(str(tmp_path))
+    for day, topic in [(3, "Loops"), (1, "Variables"), (2, "Strings"), (2, "Strings & f-strings")]:
+        log.set(day, topic)
+
+    assert log.upto(2) == {1: "Variables", 2: "Strings & f-strings"}  # later line for a day wins
+    assert log.get(3) == "Loops"
+    assert log.upto(0) == {}
+
+
+def test_readers_see_other_writers_appends(tmp_path):
+    writer, reader = TopicLog(str(tmp_path)), TopicLog(str(tmp_path))
+    writer.set(1, "Variables")
+    assert reader.upto(10) == {1: "Variables"}
+    writer.set(2, "Strings")
+    assert reader.upto(10) == {1: "Variables", 2: "Strings"}
+
+
+def test_partial_and_malformed_lines_are_skipped(tmp_path):
+    path = tmp_path / "topics.log"
+    path.write_text('{"day": 1, "topic": "Variables"}\nnot json\n{"day": 2, "topic": "Str', encoding="utf-8")
+    log = TopicLog(str(tmp_path))
+    assert log.upto(10) == {1: "Variables"}
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('ings"}\n')
+    assert log.upto(10) == {1: "Variables", 2: "Strings"}
+
+
+def test_replaced_log_is_reindexed(tmp_path):
+    log = TopicLog(str(tmp_path))
+    log.set(1, "Variables")
+    log.set(2, "Strings")
+    tmp = tmp_path / "new.log"
+    tmp.write_text(json.dumps({"day": 5, "topic": "Dicts"}) + "\n", encoding="utf-8")
+    os.replace(tmp, tmp_path / "topics.log")
+    assert log.upto(10) == {5: "Dicts"}
+
+
+def test_legacy_topics_json_is_migrated_once(tmp_path):
+    (tmp_path / "topics.json").write_text(json.dumps({"2": "Strings", "1": "Variables"}), encoding="utf-8")
+    log = TopicLog(str(tmp_path))
+    assert log.upto(10) == {1: "Variables", 2: "Strings"}
+    assert not (tmp_path / "topics.json").exists() and (tmp_path / "topics.json.migrated").exists()
+
+
+def test_concurrent_writers_never_interleave(tmp_path):
+    logs = [TopicLog(str(tmp_path)) for _ in range(4)]
+
+    def write(n, log):
+        for i in range(25):
+            log.set(n * 100 + i, f"topic {n}-{i} " + "x" * 200)
+
+    threads = [threading.Thread(target=write, args=(n, log)) for n, log in enumerate(logs)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    lines = (tmp_path / "topics.log").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 100 and all(json.loads(line) for line in lines)
+    assert len(TopicLog(str(tmp_path)).upto(10_000)) == 100
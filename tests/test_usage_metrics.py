@@ -0,0 +1,44 @@
+import json
+from types import SimpleNamespace
+
+from backend.usage_metrics import UsageTracker
+
+
+def response(prompt, output):
+    return SimpleNamespace(usage_metadata=SimpleNamespace(
+        prompt_token_count=prompt, candidates_token_count=output, total_token_count=prompt + output))
+
+
+def test_cost_uses_the_routed_models_price(tmp_path):
+    usage = UsageTracker(str(tmp_path / "usage.jsonl"))
+    assert usage.price("gemini-flash-lite-latest") == (0.10, 0.40)
+    assert usage.price("gemini-flash-latest") == (0.30, 2.50)
+    assert usage.price("fake-gemini-flash-lite-latest") == (0.10, 0.40)
+
+    usage.record("reminder", "gemini-flash-lite-latest", 0.5, response(1_000_000, 1_000_000))
+    usage.record("lesson", "gemini-flash-latest", 2.0, response(1_000_000, 1_000_000))
+    costs = {r['call_type']: r['cost'] for r in usage.rows()}
+    assert costs == {"reminder": 0.5, "lesson": 2.8}
+
+
+def test_config_prices_override_the_table(tmp_path):
+    usage = UsageTracker.from_config({'gemini_prices': {"flash-lite": [0.05, 0.2]}, 'gemini_input_price': 1.0})
+    assert usage.price("gemini-flash-lite-latest") == (0.05, 0.2)
+    assert usage.price("gemini-flash-latest")[0] == 1.0
+
+
+def test_log_rotates_and_history_spans_both_files(tmp_path):
+    usage_file = tmp_path / "usage.jsonl"
+    usage = UsageTracker(str(usage_file), max_bytes=2000)
+    for _ in range(30):
+        usage.record("quiz", "gemini-flash-latest", 1.0, response(10, 10))
+
+    assert usage_file.stat().st_size < 2000 + 300
+    rotated = tmp_path / "usage.jsonl.1"
+    assert rotated.exists()
+    lines = len(usage_file.read_text().splitlines()) + len(rotated.read_text().splitlines())
+
+    daily, routes = usage.history(days=1)
+    assert sum(day['calls'] for day in daily) == lines
+    assert routes[0]['calls'] == lines and routes[0]['model'] == "gemini-flash-latest"
+    assert json.loads(rotated.read_text().splitlines()[0])['call_type'] == "quiz"
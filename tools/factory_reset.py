@@ -9,6 +9,9 @@ ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(ROOT_DIR)
 
 from backend.db_supabase import SupabaseManager
+from backend.content_store import STORE_NAME
+from backend.topic_log import LEGACY_NAME
+from backend.wipe_cache import wipe_remote_cache
 
 print("Initializing Supabase Manager...")
 db = SupabaseManager()
@@ -79,8 +82,12 @@ def wipe_cache():
     lessons_dir = os.path.join(ROOT_DIR, 'lessons')
     html_files = glob.glob(os.path.join(lessons_dir, "*.html"))
     json_files = glob.glob(os.path.join(lessons_dir, "*.json"))
+    log_files = glob.glob(os.path.join(lessons_dir, "topics.log*"))
+    # SQLite store ('content_store': 'sqlite') with its -wal/-shm files, and the renamed topics.json
+    store_files = glob.glob(os.path.join(lessons_dir, f"{STORE_NAME}*"))
+    migrated_files = glob.glob(os.path.join(lessons_dir, f"{LEGACY_NAME}.migrated"))
     
-    files_to_delete = html_files + json_files
+    files_to_delete = html_files + json_files + log_files + store_files + migrated_files
     
     count = 0
     for f in files_to_delete:
@@ -96,6 +103,9 @@ def wipe_cache():
             print(f"   Failed to delete {f}: {e}")
             
     print(f"   ✅ Deleted {count} cache files.")
+
+    # Durable remote tier (Supabase content_cache / directory), or the next run restores the old lessons
+    wipe_remote_cache()
     
     # 2. Local Data
     local_data = [
@@ -43,12 +43,7 @@ def run():
                         with st.spinner("Sending Welcome Email..."):
                             from backend import email_service
                             config = data_manager.get_config()
-                            mailer = email_service.EmailService(
-                                config.get('email_address'), 
-                                config.get('email_password'),
-                                test_mode=config.get('test_mode', False),
-                                admin_email=config.get('admin_email', '')
-                            )
+                            mailer = email_service.EmailService.from_config(config)
                             
                             ok, msg = mailer.send_welcome_email(email, name, temp_pass)
                             if ok:
@@ -72,7 +67,7 @@ def run():
         st.markdown("### 📋 Student Roster")
         
         # metrics
-        df = pd.DataFrame(contacts)
+        df = pd.DataFrame(contacts).drop(columns=['id'], errors='ignore')
         
         # Styled Dataframe
         st.dataframe(
@@ -1,9 +1,23 @@
 import streamlit as st
-from backend import data_manager, gemini_service, email_service, lesson_manager
+from backend import data_manager, gemini_service, email_service, lesson_manager, outbox, generation_pool, quiz_analysis
 import datetime
 import pandas as pd
 from collections import defaultdict
 from views.admin import contacts, settings
+from backend.gemini_service import GenerationError
+from backend.file_lock import LockTimeout
+from backend.usage_metrics import UsageTracker
+
+# Seconds a button handler may spend waiting on SMTP retries; the rest stay queued in the
+# outbox and go out with the bot's next send of the same message
+DASHBOARD_MAX_WAIT = 20
+# The usage log is shared with the bot; re-aggregate it at most this often instead of on every rerun
+USAGE_CACHE_TTL = 300
+
+@st.cache_data(ttl=USAGE_CACHE_TTL, show_spinner=False)
+def usage_history(usage_file, days=14):
+    """(daily, per-route) Gemini usage from the metrics file, one read per TTL across sessions."""
+    return UsageTracker(usage_file).history(days)
 
 def render_dashboard():
     """
@@ -25,14 +39,10 @@ def render_dashboard():
 
     config = data_manager.get_config()
     contacts_list = data_manager.get_contacts()
-    gemini = gemini_service.GeminiService(config.get('gemini_key'))
-    mailer = email_service.EmailService(
-        config.get('email_address'), 
-        config.get('email_password'),
-        test_mode=config.get('test_mode', False),
-        admin_email=config.get('admin_email', '')
-    )
-    cache = lesson_manager.LessonManager()
+    gemini = gemini_service.GeminiService.from_config(config)
+    mailer = email_service.EmailService.from_config(config)
+    cache = lesson_manager.LessonManager.from_config(config)
+    mail_outbox = outbox.Outbox.from_config(config)
 
     if not config.get('gemini_key') or not config.get('email_address'):
         st.warning("⚠️ Please configure your API Keys and Email in 'Settings' first!")
@@ -152,6 +162,25 @@ def render_dashboard():
 
     st.progress(progress_val)
 
+    # LLM spend (every Gemini call is appended to gemini_usage.jsonl by the bot and this dashboard)
+    with st.expander("💸 Gemini Usage & Cost"):
+        daily_usage, route_usage = usage_history(gemini.usage.usage_file, days=14)
+        if daily_usage:
+            df_usage = pd.DataFrame(daily_usage).set_index("date")
+            u1, u2, u3 = st.columns(3)
+            u1.metric("Calls (14 days)", int(df_usage['calls'].sum()))
+            u2.metric("Tokens (14 days)", f"{int(df_usage['tokens'].sum()):,}")
+            u3.metric("Est. Cost (14 days)", f"${df_usage['cost'].sum():.4f}")
+            st.bar_chart(df_usage[['tokens']])
+            st.dataframe(df_usage)
+            st.caption("Latency by route (task → model)")
+            st.dataframe(pd.DataFrame(route_usage), hide_index=True)
+        else:
+            st.caption("No Gemini calls recorded yet.")
+        st.caption(f"History refreshes every {USAGE_CACHE_TTL // 60} minutes.")
+        st.caption(gemini.usage.summary())
+        st.caption(cache.content_cache.summary())
+
     st.divider()
 
     # --- Main Dashboard ---
@@ -198,12 +227,20 @@ def render_dashboard():
                     from backend import curriculum
                     topic = curriculum.TOPICS.get(target_day, "Python Concepts")
                     
-                    # Call Gemini
-                    raw_json = gemini.generate_class_insights(day_results, topic)
+                    # Score against the cached quiz key (per-student wrong questions + class miss rates)
+                    key = quiz_analysis.answer_key(cache, target_day)
+                    question_summary = quiz_analysis.enrich_results(day_results, key) if key else ""
                     
-                    # Store in Session State
-                    st.session_state['insight_data'] = raw_json
-                    st.success("Analysis Complete!")
+                    # Call Gemini
+                    try:
+                        raw_json = gemini.generate_class_insights(day_results, topic, question_summary)
+                        st.session_state['insight_questions'] = question_summary
+                        
+                        # Store in Session State
+                        st.session_state['insight_data'] = raw_json
+                        st.success("Analysis Complete!")
+                    except GenerationError as e:
+                        st.error(f"AI analysis failed ({e.kind}): {e}")
             
             # 3. Review & Send
             if 'insight_data' in st.session_state:
@@ -214,6 +251,10 @@ def render_dashboard():
                     
                     st.write(f"Generated feedback for {len(feedback_list)} students.")
                     
+                    if st.session_state.get('insight_questions'):
+                        with st.expander("📉 Most Missed Questions"):
+                            st.text(st.session_state['insight_questions'])
+                    
                     with st.expander("👁️ Preview Feedback Messages"):
                         for item in feedback_list:
                             st.write(f"**To: {item['email']}**")
@@ -298,12 +339,46 @@ def render_dashboard():
                     else:
                         st.warning("⚠️ Not Cached")
                         if st.button(f"⚡ Generate Day {day}"):
-                             with st.spinner("Building Lesson..."):
+                             try:
+                                 import streamlit.components.v1 as components
+                                 from backend import curriculum
+                                 from backend.html_minifier import strip_fences
+                                 topic = curriculum.TOPICS.get(day, "Python Concepts")
+                                 phase, phase_goal = curriculum.get_phase_info(day)
                                  history = cache.get_topics_history(day - 1)
-                                 content = gemini.generate_lesson(day, history)
-                                 cache.save_lesson(day, content)
-                             st.success("Generated & Saved!")
-                             st.rerun()
+
+                                 # Live preview: render the partial HTML as it streams in
+                                 status = st.empty()
+                                 preview = st.empty()
+                                 status.info("Building Lesson...")
+                                 with cache.generation_lock(day):
+                                     # Another session or the bot may have generated it while we waited
+                                     if not cache.get_lesson(day):
+                                         chunks = gemini.generate_lesson_stream(day, topic, phase, phase_goal, history)
+                                         for partial in cache.stream_lesson(day, chunks):
+                                             status.info(f"Building Lesson... {len(partial)} characters received")
+                                             with preview.container():
+                                                 components.html(strip_fences(partial), height=400, scrolling=True)
+                                 st.success("Generated & Saved!")
+                                 st.rerun()
+                             except LockTimeout:
+                                 status.empty()
+                                 st.warning(f"⏳ Day {day} is already being generated (bot or another session). Try again shortly.")
+                             except GenerationError as e:
+                                 st.error(f"Generation failed ({e.kind}): {e}")
+
+            missing_days = [day for day in sorted(day_groups) if not cache.get_lesson(day)]
+            if missing_days and st.button(f"⚡ Generate All Missing ({len(missing_days)} days)", use_container_width=True):
+                pool = generation_pool.GenerationPool.from_config(gemini, cache, config)
+                progress_bar = st.progress(0)
+                done = 0
+                with st.spinner(f"Generating {len(missing_days)} lessons concurrently..."):
+                    for request, content, error in pool.generate([{'type': 'lesson', 'day': day} for day in missing_days]):
+                        done += 1
+                        progress_bar.progress(done / len(missing_days))
+                        if error is not None:
+                            st.error(f"Day {request['day']} failed ({getattr(error, 'kind', 'fatal')}): {error}")
+                st.rerun()
 
             if st.button("🚀 Process Standard Queue", type="primary", use_container_width=True):
                 progress_bar = st.progress(0)
@@ -329,19 +404,27 @@ def render_dashboard():
                         # Get History for Cumulative Practice
                         history = cache.get_topics_history(day - 1)
                         
-                        # Call Gemini with new Signature
-                        content = gemini.generate_lesson(day, topic, phase, phase_goal, history)
-                        cache.save_lesson(day, content)
+                        # Call Gemini with new Signature (reuses a generation already in flight)
+                        try:
+                            content = cache.get_or_create(
+                                day, lambda: gemini.generate_lesson(day, topic, phase, phase_goal, history))
+                        except GenerationError as e:
+                            st.error(f"Day {day} skipped: generation failed ({e.kind}): {e}")
+                            current_group_idx += 1
+                            progress_bar.progress(current_group_idx / total_groups)
+                            continue
                     
                     status_text.write(f"Sending to {len(group)} students...")
                     subject_line = f"🐍 Day {day}: {topic}"
-                    success, msg = mailer.send_email(group, subject_line, content)
+                    message_id = mail_outbox.enqueue(group, subject_line, content)
+                    delivered = set(mail_outbox.deliver(message_id, mailer, max_wait=DASHBOARD_MAX_WAIT, expire=False))
                     
-                    if success:
-                        for student in group:
+                    for student in group:
+                        if student['email'] in delivered:
                             data_manager.update_contact_status(student['email'], status='lesson_sent')
-                    else:
-                        st.error(f"Day {day} Failed: {msg}")
+                    if len(delivered) < len(group):
+                        st.error(f"Day {day}: {len(group) - len(delivered)} not delivered {mail_outbox.counts(message_id)}. "
+                                 "Retrying recipients go out with the next send of this lesson.")
                     
                     current_group_idx += 1
                     progress_bar.progress(current_group_idx / total_groups)
@@ -376,16 +459,26 @@ def render_dashboard():
                     content = cache.get_reminder(day)
                     if not content:
                         status_text.write(f"Generating Day {day} Reminder...")
-                        content = gemini.generate_reminder(day)
-                        cache.save_reminder(day, content)
+                        try:
+                            content = cache.get_or_create(day, lambda: gemini.generate_reminder(day), type="reminder")
+                        except GenerationError as e:
+                            st.error(f"Day {day} skipped: generation failed ({e.kind}): {e}")
+                            current_group_idx += 1
+                            progress_bar.progress(current_group_idx / total_groups)
+                            continue
                     
                     status_text.write(f"Sending reminders for Day {day}...")
-                    success, msg = mailer.send_email(group, f"🌙 PyDaily Check-in: Day {day}", content)
+                    message_id = mail_outbox.enqueue(group, f"🌙 PyDaily Check-in: Day {day}", content)
+                    delivered = set(mail_outbox.deliver(message_id, mailer, max_wait=DASHBOARD_MAX_WAIT,
+                                                        broadcast=True, expire=False))
                     
-                    if success:
-                        # Advance Day
-                        for student in group:
+                    # Advance Day (delivered students only)
+                    for student in group:
+                        if student['email'] in delivered:
                             data_manager.update_contact_status(student['email'], day=day+1, status='pending')
+                    if len(delivered) < len(group):
+                        st.error(f"Day {day}: {len(group) - len(delivered)} reminders not delivered {mail_outbox.counts(message_id)}. "
+                                 "Retrying recipients go out with the next send of this reminder.")
                     
                     current_group_idx += 1
                     progress_bar.progress(current_group_idx / total_groups)
@@ -412,11 +505,13 @@ def render_dashboard():
             
         if not cached_motivation:
             if st.button("🎲 Generate Fresh Quote", use_container_width=True):
-                with st.spinner("Finding inspiration..."):
-                    content = gemini.generate_motivation()
-                    cache.save_motivation(today_str, content)
-                    st.session_state.motivation_content = content
+                try:
+                    with st.spinner("Finding inspiration..."):
+                        content = cache.get_or_create(today_str, gemini.generate_motivation, type="motivation")
+                        st.session_state.motivation_content = content
                     st.rerun()
+                except GenerationError as e:
+                    st.error(f"Generation failed ({e.kind}): {e}")
                 
         if st.session_state.motivation_content:
             # Preview
@@ -438,7 +533,7 @@ def render_dashboard():
                     status = st.empty()
                     status.write("Sending blasts...")
                     
-                    success, msg = mailer.send_email(active_recipients, "⚡ Mid-Day Boost: Keep Going!", st.session_state.motivation_content)
+                    success, msg = mailer.send_email(active_recipients, "⚡ Mid-Day Boost: Keep Going!", st.session_state.motivation_content, broadcast=True)
                     
                     progress_bar.progress(100)
                     if success:
@@ -481,14 +576,16 @@ def render_dashboard():
                     else:
                         st.warning("⚠️ Not Generated")
                         if st.button(f"⚡ Generate Quiz Day {day}"):
-                             with st.spinner("Building Senior-Level Quiz..."):
-                                 # 1. Get History
-                                 history = cache.get_topics_history(day)
-                                 # 2. Generate
-                                 content = gemini.generate_quiz(day, history)
-                                 cache.save_lesson(day, content)
-                             st.success("Generated & Saved!")
-                             st.rerun()
+                             try:
+                                 with st.spinner("Building Senior-Level Quiz..."):
+                                     # 1. Get History
+                                     history = cache.get_topics_history(day)
+                                     # 2. Generate
+                                     cache.get_or_create(day, lambda: gemini.generate_quiz(day, history))
+                                 st.success("Generated & Saved!")
+                                 st.rerun()
+                             except GenerationError as e:
+                                 st.error(f"Generation failed ({e.kind}): {e}")
 
             if st.button("🚀 Send Quiz Modules", type="primary", use_container_width=True):
                 progress_bar = st.progress(0)
@@ -504,8 +601,13 @@ def render_dashboard():
                     if not content:
                         status_text.write(f"Generating Quiz...")
                         history = cache.get_topics_history(day)
-                        content = gemini.generate_quiz(day, history)
-                        cache.save_lesson(day, content)
+                        try:
+                            content = cache.get_or_create(day, lambda: gemini.generate_quiz(day, history))
+                        except GenerationError as e:
+                            st.error(f"Quiz Day {day} skipped: generation failed ({e.kind}): {e}")
+                            current_group_idx += 1
+                            progress_bar.progress(current_group_idx / total_groups)
+                            continue
                     
                     status_text.write(f"Sending to {len(group)} students...")
                     
@@ -2,6 +2,7 @@ import streamlit as st
 import time
 from backend.db_supabase import SupabaseManager
 from backend.lesson_manager import LessonManager
+from backend import data_manager
 
 def run():
     st.markdown("""
@@ -103,7 +104,7 @@ def run():
         selected_day = st.selectbox("Select Lesson Day", available_days, index=len(available_days)-1, format_func=lambda x: f"Day {x}")
         
         # 2. Render Content
-        cache = LessonManager()
+        cache = LessonManager.from_config(data_manager.get_config())
         content = cache.get_lesson(selected_day)
         
         if content:
@@ -136,11 +137,14 @@ def run():
                 st.warning("Quiz content not found.")
             else:
                 # 3. Parse JSON
-                import json
+                from backend.structured_output import repair_json
                 try:
-                    # Robust JSON parsing (handle if it's wrapped in strings or markdown)
-                    clean_json = quiz_content.replace('```json', '').replace('```', '').strip()
-                    quiz_data = json.loads(clean_json)
+                    # Robust JSON parsing (fences, stray prose and near-valid JSON are repaired)
+                    quiz_data = repair_json(quiz_content)
+                    # Valid JSON of the wrong shape (a bare list, string questions) gets the legacy view too
+                    questions = quiz_data.get('questions', []) if isinstance(quiz_data, dict) else None
+                    if not isinstance(questions, list) or not all(isinstance(q, dict) for q in questions):
+                        raise ValueError("Quiz JSON is not a {title, questions: [...]} object")
                     
                     st.divider()
                     st.markdown(f"### 🎯 {quiz_data.get('title', 'Quiz')}")
@@ -205,6 +209,6 @@ def run():
                             elif correct_count >= total / 2:
                                 st.snow()
                                 
-                except json.JSONDecodeError:
+                except ValueError:
                     st.error("⚠️ Error loading Interactive Quiz. It might be in the old legacy format.")
                     st.expander("View Legacy Content").code(quiz_content)